@@ -0,0 +1,484 @@
+# src/bench.py
+"""
+Performance benchmarks. Run from src/:
+
+    python bench.py astar [--size 300] [--queries 50]
+    python bench.py route [--size 300] [--queries 50]
+    python bench.py save  [--size 300]
+    python bench.py build [--size 200]
+    python bench.py suite [--size 300] [--layout grid|organic] [--sims 500]
+                          [--ticks 600] [--growth-workers 0] [--out bench.json]
+    python bench.py compare OLD.json NEW.json [--tolerance 0.15]
+
+`suite` writes its results as JSON; `compare` diffs two such files and
+exits non-zero if anything got slower than the tolerance allows.
+"""
+
+import argparse, json, os, platform, random, subprocess, sys, tempfile, time
+from heapq import heappush, heappop
+import numpy as np
+from tile        import Tile, tile_ids
+from pathfinding import a_star, heuristic, passable_mask
+from map         import MapManager
+from roadgraph   import RoadGraph
+import savefile
+
+def legacy_a_star(grid, start, goal, valid_tiles):
+    """The dict/tuple a_star that pathfinding.a_star replaced, kept for comparison."""
+    passable = np.isin(grid, tile_ids(valid_tiles)).tolist()
+    rows, cols = len(passable), len(passable[0])
+    open_set = []
+    heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+
+    while open_set:
+        _, current = heappop(open_set)
+
+        if current == goal:
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path
+
+        for dy, dx in [(-1,0), (1,0), (0,-1), (0,1)]:
+            neighbor = (current[0] + dy, current[1] + dx)
+            if (0 <= neighbor[0] < rows and
+                0 <= neighbor[1] < cols and
+                passable[neighbor[0]][neighbor[1]]):
+
+                tentative_g = g_score[current] + 1
+                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    f = tentative_g + heuristic(neighbor, goal)
+                    heappush(open_set, (f, neighbor))
+    return []
+
+# ——— Synthetic maps ——————————————————————————————————————————————————
+def random_road_grid(size, rng, block=6, keep=0.85, noise=0.05):
+    """
+    size x size grid of city blocks: road every `block` tiles with a
+    fraction of segments knocked out, plus scattered stray road tiles.
+    """
+    grid = np.full((size, size), Tile.GRASS, dtype=np.uint8)
+    for i in range(0, size, block):
+        grid[i, :] = Tile.ROAD
+        grid[:, i] = Tile.ROAD
+    for r in range(0, size, block):
+        for c in range(0, size, block):
+            if rng.random() > keep:
+                grid[r, c+1:c+block] = Tile.GRASS
+            if rng.random() > keep:
+                grid[r+1:r+block, c] = Tile.GRASS
+    stray = np.array([rng.random() < noise for _ in range(size*size)]).reshape(size, size)
+    grid[stray] = Tile.ROAD
+    return grid
+
+def organic_roads(size, rng, walkers=None, turn=0.15, branch=0.02):
+    """
+    Winding roads grown by random walkers from the map centre: each step
+    goes on, turns with probability `turn` and sometimes forks a new walker.
+    """
+    grid = np.full((size, size), Tile.GRASS, dtype=np.uint8)
+    walkers = walkers or max(4, size // 10)
+    steps   = size * size // 8           # ~1/8 of the map ends up road
+    dirs    = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    live = [(size // 2, size // 2, rng.choice(dirs)) for _ in range(walkers)]
+    for _ in range(steps):
+        i = rng.randrange(len(live))
+        r, c, (dr, dc) = live[i]
+        if rng.random() < turn:
+            dr, dc = rng.choice(dirs)
+        r, c = min(max(r + dr, 0), size - 1), min(max(c + dc, 0), size - 1)
+        grid[r, c] = Tile.ROAD
+        live[i] = (r, c, (dr, dc))
+        if rng.random() < branch:
+            live.append((r, c, rng.choice(dirs)))
+    return grid
+
+def zone_lots(grid, rng, density=0.6, zoned=0.3):
+    """
+    Fill grass next to roads: `density` of those lots are built up (houses
+    and factories), `zoned` of them left as zones for grow_zones to work on.
+    """
+    road = grid == Tile.ROAD
+    near = np.zeros_like(road)
+    near[1:, :] |= road[:-1, :]; near[:-1, :] |= road[1:, :]
+    near[:, 1:] |= road[:, :-1]; near[:, :-1] |= road[:, 1:]
+    lots = np.argwhere(near & (grid == Tile.GRASS)).tolist()
+    rng.shuffle(lots)
+    built, zones = int(len(lots) * density), int(len(lots) * (density + zoned))
+    for i, (r, c) in enumerate(lots[:zones]):
+        if i < built:
+            grid[r, c] = Tile.HOUSE if rng.random() < 0.6 else Tile.FACTORY
+        else:
+            grid[r, c] = Tile.ZONE_RESIDENTIAL if rng.random() < 0.5 else Tile.ZONE_INDUSTRIAL
+    return grid
+
+def synthetic_city(size=300, layout="grid", sims=500, density=0.6, seed=1, path_workers=0,
+                   growth_workers=0):
+    """
+    A Simulation on a generated size x size city: `layout` roads ("grid" or
+    "organic"), lots built up to `density`, and `sims` Sims placed on roads.
+    Same arguments, same city.
+    """
+    from simulation import Simulation
+    from sim import Sim
+    rng = random.Random(seed)
+    if layout == "grid":
+        grid = random_road_grid(size, rng, noise=0.0)
+    elif layout == "organic":
+        grid = organic_roads(size, rng)
+    else:
+        raise ValueError(f"unknown layout {layout!r}")
+    zone_lots(grid, rng, density)
+
+    world = Simulation(size, size, seed=seed, path_workers=path_workers,
+                       growth_workers=growth_workers)
+    world.map_mgr.load_grid(grid)
+    roads = [tuple(p) for p in np.argwhere(grid == Tile.ROAD).tolist()]
+    for r, c in rng.choices(roads, k=sims):
+        world.add_sim(Sim(c, r))
+    return world
+
+def _percentile(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs)-1, int(p / 100 * len(xs)))]
+
+# ——— Benchmarks —————————————————————————————————————————————————————————
+def bench_astar(size=300, queries=50, seed=1):
+    rng  = random.Random(seed)
+    grid = random_road_grid(size, rng)
+    roads = [tuple(p) for p in np.argwhere(grid == Tile.ROAD).tolist()]
+    pairs = [(rng.choice(roads), rng.choice(roads)) for _ in range(queries)]
+    mask  = passable_mask(grid, ["road"])
+
+    results = {}
+    for name, fn in (("legacy", lambda s, g: legacy_a_star(grid, s, g, ["road"])),
+                     ("a_star", lambda s, g: a_star(grid, s, g, ["road"])),
+                     ("a_star+mask", lambda s, g: a_star(grid, s, g, ["road"], passable=mask))):
+        times, lengths = [], []
+        for s, g in pairs:
+            t0 = time.perf_counter()
+            path = fn(s, g)
+            times.append((time.perf_counter() - t0) * 1000)
+            lengths.append(len(path))
+        results[name] = {"mean_ms": sum(times) / len(times),
+                         "p50_ms":  _percentile(times, 50),
+                         "p95_ms":  _percentile(times, 95),
+                         "lengths": lengths}
+
+    base = results["legacy"]["lengths"]
+    for name, r in results.items():
+        same = "ok" if r.pop("lengths") == base else "PATH LENGTH MISMATCH"
+        print(f"{name:12s} mean {r['mean_ms']:8.2f} ms  p50 {r['p50_ms']:8.2f}  "
+              f"p95 {r['p95_ms']:8.2f}  speedup x{results['legacy']['mean_ms']/r['mean_ms']:.1f}  {same}")
+    return results
+
+def bench_route(size=300, queries=50, seed=1):
+    """Grid a_star over road tiles vs. RoadGraph.route on the same trips."""
+    rng  = random.Random(seed)
+    grid = random_road_grid(size, rng, noise=0.0)
+    m = MapManager(size, size, rng=rng)
+    m.load_grid(grid)
+    t0 = time.perf_counter()
+    graph = RoadGraph(m)
+    graph.refresh()
+    build_ms = (time.perf_counter() - t0) * 1000
+    roads = sorted(graph.roads)
+    pairs = [(rng.choice(roads), rng.choice(roads)) for _ in range(queries)]
+    mask  = m.passable(["road"])
+
+    grid_ms, graph_ms, expanded, mismatches = [], [], [], 0
+    for s, g in pairs:
+        t0 = time.perf_counter()
+        p1 = a_star(grid, s, g, ["road"], passable=mask)
+        grid_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        p2 = graph.route(s, g)
+        graph_ms.append((time.perf_counter() - t0) * 1000)
+        expanded.append(graph.last_expanded)
+        mismatches += len(p1) != len(p2)
+
+    print(f"road graph: {len(graph.nodes)} nodes, {len(graph.edges)} edges for "
+          f"{len(roads)} road tiles, built in {build_ms:.1f} ms")
+    print(f"grid a_star  mean {sum(grid_ms)/queries:8.2f} ms  p95 {_percentile(grid_ms, 95):8.2f}")
+    print(f"graph route  mean {sum(graph_ms)/queries:8.2f} ms  p95 {_percentile(graph_ms, 95):8.2f}  "
+          f"nodes expanded mean {sum(expanded)/queries:.0f}  "
+          f"{'ok' if not mismatches else f'{mismatches} PATH LENGTH MISMATCHES'}")
+    return {"grid_ms": grid_ms, "graph_ms": graph_ms, "expanded": expanded}
+
+def bench_build(size=200, block=4, seed=1):
+    """
+    Lay a road every `block` rows and columns of an empty size x size map,
+    tile by tile through apply_tool vs. one apply_tool_cells batch.
+    """
+    from simulation import Simulation
+    cells = [(r, c) for r in range(size) for c in range(size)
+             if r % block == 0 or c % block == 0]
+    results, maps = {}, []
+    for name in ("per tile", "batch"):
+        world = Simulation(size, size, seed=seed, path_workers=0)
+        world.money = 10 * len(cells)
+        t0 = time.perf_counter()
+        if name == "batch":
+            world.apply_tool_cells("road", cells)
+        else:
+            for r, c in cells:
+                world.apply_tool("road", r, c)
+        ms = (time.perf_counter() - t0) * 1000
+        maps.append(world.map_mgr.grid.to_dense())
+        results[name] = {"ms": ms}
+        print(f"{name:9s} {ms:9.1f} ms")
+        world.close()
+    print(f"{len(cells)} road tiles  {'ok' if (maps[0] == maps[1]).all() else 'MAPS DIFFER'}")
+    return results
+
+def _timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        ms = (time.perf_counter() - t0) * 1000
+        best = ms if best is None else min(best, ms)
+    return best
+
+def _json_tiles(fn):
+    import json
+    from tile import TILE_IDS
+    with open(fn) as f:
+        names = json.load(f)
+    return np.array([[TILE_IDS[n] for n in row] for row in names], dtype=np.uint8)
+
+def bench_save(size=300, seed=1):
+    """JSON map save/load vs. the binary save format, on a built-up size x size city."""
+    from simulation import Simulation
+    rng  = random.Random(seed)
+    grid = random_road_grid(size, rng)
+    lots = (grid == Tile.GRASS) & (np.random.default_rng(seed).random(grid.shape) < 0.3)
+    grid[lots] = np.random.default_rng(seed).choice([Tile.HOUSE, Tile.FACTORY], size=int(lots.sum()))
+    world = Simulation(size, size, seed=seed, path_workers=0)
+    world.map_mgr.load_grid(grid)
+    world.step(1200)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as d:
+        js, bn, bz = (os.path.join(d, f) for f in ("map.json", "city.tts", "city_z.tts"))
+        rows = [
+            ("json map + rebuild", lambda: world.save_map(js),  lambda: world.load_map(js),  js),
+            ("json parse only",    lambda: None, lambda: _json_tiles(js),                    js),
+            ("binary (mmap)",      lambda: savefile.save(world, bn),
+                                   lambda: savefile.read_tiles(bn),                          bn),
+            ("binary (zlib)",      lambda: savefile.save(world, bz, compress_tiles=True),
+                                   lambda: savefile.read_tiles(bz),                          bz),
+            # whole world: map listeners (roads, components, ...) rebuild here too
+            ("binary + rebuild",   lambda: None, lambda: savefile.load(world, bn),           bn),
+        ]
+        for name, save, load, fn in rows:
+            save_ms = _timed(save)
+            load_ms = _timed(load)
+            results[name] = {"save_ms": save_ms, "load_ms": load_ms, "bytes": os.path.getsize(fn)}
+            print(f"{name:18s} save {save_ms:9.1f} ms  load {load_ms:9.1f} ms  "
+                  f"size {os.path.getsize(fn)/1024:9.1f} KiB")
+        snap_ms = _timed(lambda: savefile.snapshot(world))
+        print(f"background save blocks the loop for the snapshot only: {snap_ms:.1f} ms")
+        results["snapshot_ms"] = snap_ms
+    world.close()
+    return results
+
+def _stats(ms):
+    a = np.asarray(ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(a, (50, 95, 99)).tolist()
+    return {"n": len(a), "mean_ms": float(a.mean()), "p50_ms": p50,
+            "p95_ms": p95, "p99_ms": p99, "max_ms": float(a.max())}
+
+def _calls(fn, args):
+    ms = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(*a)
+        ms.append((time.perf_counter() - t0) * 1000)
+    return _stats(ms)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_suite(size=300, layout="grid", sims=500, ticks=600, queries=200,
+                frames=120, seed=1, out=None, growth_workers=0):
+    """
+    Headless tick rate plus per-subsystem latencies on one synthetic city.
+    Returns (and with out=, writes) a JSON-ready dict; "results" maps each
+    metric to its numbers so compare() can diff two runs key by key.
+    """
+    from config import WALK_TILES
+    from profiler import Profiler
+    world = synthetic_city(size, layout, sims, seed=seed, growth_workers=growth_workers)
+    rng   = random.Random(seed)
+    m     = world.map_mgr
+    results = {}
+    try:
+        # ——— Whole ticks, with the engine's own per-section timings ———
+        world.profiler = Profiler(window=ticks)
+        t0 = time.perf_counter()
+        for _ in range(ticks):
+            world.step()
+        dt = time.perf_counter() - t0
+        results["ticks"] = {"ticks_per_s": ticks / dt, "sims": len(world.sims),
+                            "vehicles": len(world.vehicles)}
+        summary = world.profiler.summary()
+        for name in ("economy", "zone growth", "sims", "vehicles", "pathfinding"):
+            s = summary.get(name)
+            if s:
+                results["tick." + name.replace(" ", "_")] = {
+                    "mean_ms": s["mean"], "p50_ms": s["p50"], "p95_ms": s["p95"],
+                    "p99_ms": s["p99"], "max_ms": s["max"]}
+
+        # ——— Single calls ———
+        walkable = m.positions(tile_ids(WALK_TILES))
+        pairs = [(rng.choice(walkable), rng.choice(walkable)) for _ in range(queries)]
+        mask  = m.passable(WALK_TILES)
+        results["a_star"] = _calls(lambda s, g: a_star(m.grid, s, g, WALK_TILES, passable=mask),
+                                   pairs)
+        # from roads, like a Sim looking for a home or job
+        starts = [(c, r) for r, c in rng.sample(m.positions((Tile.ROAD,)), min(queries, 50))]
+        results["find_nearest"] = _calls(lambda x, y: m.find_nearest("factory", x, y), starts)
+        results["find_nearest_free"] = _calls(
+            lambda x, y: world.find_nearest_tile("house", x, y, occupied_check=True),
+            [(x, y) for x, y in starts for _ in range(max(1, queries // len(starts)))])
+        results["economy_update"] = _calls(lambda: world.econ.update(m.grid), [()] * queries)
+        # what verify mode and a load pay: a full recount of the map
+        results["economy_recount"] = _calls(lambda: world.econ.count_tiles(m.grid), [()] * queries)
+        results["grow_zones"] = _calls(lambda: m.grow_zones(1, 1), [()] * queries)
+
+        results.update(_bench_draw(world, frames))
+    finally:
+        world.close()
+
+    report = {
+        "benchmark": "suite", "commit": _git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(), "numpy": np.__version__,
+        "machine": platform.machine(),
+        "params": {"size": size, "layout": layout, "sims": sims, "ticks": ticks,
+                   "queries": queries, "frames": frames, "seed": seed},
+        "results": results,
+    }
+    for name, r in results.items():
+        print(f"{name:22s} " + "  ".join(f"{k} {v:.3f}" if isinstance(v, float) else f"{k} {v}"
+                                         for k, v in r.items()))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+        print("wrote", out)
+    return report
+
+def _bench_draw(world, frames):
+    """Map and agent drawing on a dummy display, panning so chunks get re-rendered."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from config import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE
+    from camera   import Camera
+    from renderer import TileRenderer, AgentRenderer
+    pygame.display.init()
+    try:
+        screen   = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        camera   = Camera()
+        renderer = TileRenderer(world.map_mgr)
+        agents   = AgentRenderer(world)
+        span_x = max(0, world.map_mgr.cols * TILE_SIZE - SCREEN_WIDTH)
+        span_y = max(0, world.map_mgr.rows * TILE_SIZE - SCREEN_HEIGHT)
+        tiles_ms, agents_ms = [], []
+        for i in range(frames):
+            camera.x = span_x * i // max(1, frames - 1)
+            camera.y = span_y * i // max(1, frames - 1)
+            t0 = time.perf_counter()
+            renderer.draw(screen, camera)
+            t1 = time.perf_counter()
+            agents.draw(screen, camera)
+            t2 = time.perf_counter()
+            tiles_ms.append((t1 - t0) * 1000)
+            agents_ms.append((t2 - t1) * 1000)
+        world.map_mgr.listeners.remove(renderer)
+    finally:
+        pygame.display.quit()
+    return {"draw_tiles": _stats(tiles_ms), "draw_agents": _stats(agents_ms)}
+
+# metrics where bigger is better; every other number is a time
+_HIGHER_IS_BETTER = {"ticks_per_s"}
+_COMPARED = ("ticks_per_s", "mean_ms", "p95_ms")
+
+def compare(old_fn, new_fn, tolerance=0.15):
+    """
+    Diff two suite reports metric by metric. Returns the regressions: the
+    metrics more than `tolerance` (a fraction) worse in new than in old.
+    """
+    with open(old_fn) as f:
+        old = json.load(f)
+    with open(new_fn) as f:
+        new = json.load(f)
+    if old["params"] != new["params"]:
+        print("⚠️  runs used different parameters; numbers may not be comparable")
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    regressions = []
+    for name, after in new["results"].items():
+        before = old["results"].get(name, {})
+        for key in _COMPARED:
+            if key not in after or not before.get(key):
+                continue
+            change = after[key] / before[key] - 1
+            worse = -change if key in _HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append((name, key, before[key], after[key]))
+            print(f"{name:22s} {key:12s} {before[key]:10.3f} -> {after[key]:10.3f}  "
+                  f"{change:+7.1%}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiletopia benchmarks")
+    parser.add_argument("which", choices=["astar", "route", "save", "build", "suite", "compare"])
+    parser.add_argument("files", nargs="*", help="compare: OLD.json NEW.json")
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--layout", choices=["grid", "organic"], default="grid")
+    parser.add_argument("--sims", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--growth-workers", type=int, default=0,
+                        help="suite: processes for the zone-growth chunk scan")
+    parser.add_argument("--out", metavar="FILE", help="suite: write results as JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="compare: slowdown (fraction) that counts as a regression")
+    args = parser.parse_args()
+
+    if args.which == "astar":
+        print(f"a_star on {args.size}x{args.size} random road grid, {args.queries} queries")
+        bench_astar(args.size, args.queries, args.seed)
+    elif args.which == "route":
+        print(f"vehicle routing on {args.size}x{args.size} road grid, {args.queries} trips")
+        bench_route(args.size, args.queries, args.seed)
+    elif args.which == "save":
+        print(f"save/load of a {args.size}x{args.size} city")
+        bench_save(args.size, args.seed)
+    elif args.which == "build":
+        print(f"road grid on an empty {args.size}x{args.size} map")
+        bench_build(args.size, seed=args.seed)
+    elif args.which == "suite":
+        print(f"suite on a {args.size}x{args.size} {args.layout} city with {args.sims} Sims")
+        bench_suite(args.size, args.layout, args.sims, args.ticks, args.queries,
+                    args.frames, args.seed, args.out, args.growth_workers)
+    elif args.which == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs OLD.json NEW.json")
+        if compare(*args.files, tolerance=args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,143 @@
+# src/chunks.py
+
+import numpy as np
+from config import MAP_CHUNK_TILES
+from tile   import Tile
+
+class ChunkedGrid:
+    """
+    rows x cols map of uint8 Tile ids stored as square chunks that only
+    exist once something other than `fill` (grass) is written into them.
+    An untouched 10k x 10k world costs a dict lookup per read and nothing
+    else; memory and whole-map scans grow with the built-up area instead.
+
+    Indexing mirrors a 2-D NumPy array for single cells (grid[row, col]);
+    bulk work goes through iter_chunks(), window(), positions() and count().
+    """
+    def __init__(self, rows, cols, chunk=MAP_CHUNK_TILES, fill=Tile.GRASS):
+        self.rows   = rows
+        self.cols   = cols
+        self.chunk  = chunk
+        self.fill   = int(fill)
+        self.chunks = {}     # (chunk_row, chunk_col) -> chunk x chunk uint8 array
+
+    @property
+    def shape(self):
+        return (self.rows, self.cols)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.chunks.values())
+
+    # ——— Cell access ———————————————————————————————————————————————————
+    def __getitem__(self, cell):
+        r, c = cell
+        C = self.chunk
+        block = self.chunks.get((r // C, c // C))
+        return self.fill if block is None else int(block[r % C, c % C])
+
+    def __setitem__(self, cell, tile):
+        r, c = cell
+        C = self.chunk
+        key = (r // C, c // C)
+        block = self.chunks.get(key)
+        if block is None:
+            if tile == self.fill:
+                return
+            block = self.chunks[key] = np.full((C, C), self.fill, dtype=np.uint8)
+        block[r % C, c % C] = tile
+        # bulldozed back to nothing: give the memory back
+        if tile == self.fill and not (block != self.fill).any():
+            del self.chunks[key]
+
+    def scatter(self, rows, cols, tiles):
+        """
+        grid[rows[i], cols[i]] = tiles[i] for whole arrays of distinct
+        cells, one chunk at a time. Returns the ids they held before.
+        """
+        C = self.chunk
+        old = np.full(len(rows), self.fill, dtype=np.uint8)
+        keys = (rows // C) * (-(-self.cols // C)) + cols // C
+        order = np.argsort(keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(keys[order])) + 1
+        for part in np.split(order, bounds):
+            key = (int(rows[part[0]]) // C, int(cols[part[0]]) // C)
+            rs, cs, new = rows[part] % C, cols[part] % C, tiles[part]
+            block = self.chunks.get(key)
+            if block is None:
+                if (new == self.fill).all():
+                    continue
+                block = self.chunks[key] = np.full((C, C), self.fill, dtype=np.uint8)
+            old[part] = block[rs, cs]
+            block[rs, cs] = new
+            if (new == self.fill).any() and not (block != self.fill).any():
+                del self.chunks[key]
+        return old
+
+    # ——— Bulk access ———————————————————————————————————————————————————
+    def iter_chunks(self):
+        """(row0, col0, block) per materialized chunk, block clipped to the map."""
+        C = self.chunk
+        for (cr, cc), block in self.chunks.items():
+            r0, c0 = cr * C, cc * C
+            yield r0, c0, block[:min(C, self.rows - r0), :min(C, self.cols - c0)]
+
+    def window(self, r0, r1, c0, c1):
+        """Dense copy of rows r0:r1, cols c0:c1; cells off the map read as fill."""
+        out = np.full((r1 - r0, c1 - c0), self.fill, dtype=np.uint8)
+        C = self.chunk
+        for cr in range(max(r0, 0) // C, (min(r1, self.rows) - 1) // C + 1):
+            for cc in range(max(c0, 0) // C, (min(c1, self.cols) - 1) // C + 1):
+                block = self.chunks.get((cr, cc))
+                if block is None:
+                    continue
+                br, bc = cr * C, cc * C
+                lo_r, hi_r = max(r0, br), min(r1, br + C, self.rows)
+                lo_c, hi_c = max(c0, bc), min(c1, bc + C, self.cols)
+                if hi_r <= lo_r or hi_c <= lo_c:
+                    continue
+                out[lo_r-r0:hi_r-r0, lo_c-c0:hi_c-c0] = block[lo_r-br:hi_r-br, lo_c-bc:hi_c-bc]
+        return out
+
+    def to_dense(self):
+        return self.window(0, self.rows, 0, self.cols)
+
+    def positions(self, tiles):
+        """Every (row, col) holding one of the tile ids in tiles (fill excluded)."""
+        tiles = [t for t in tiles if t != self.fill]
+        if not tiles:
+            return []
+        found = [np.argwhere(np.isin(block, tiles)) + (r0, c0)
+                 for r0, c0, block in self.iter_chunks()]
+        if not found:
+            return []
+        rc = np.concatenate(found)
+        return list(zip(rc[:, 0].tolist(), rc[:, 1].tolist()))
+
+    def count(self, minlength):
+        """Per-tile-id counts over the whole map, like np.bincount on a dense grid."""
+        counts = np.zeros(minlength, dtype=np.int64)
+        covered = 0
+        for _, _, block in self.iter_chunks():
+            counts += np.bincount(block.ravel(), minlength=minlength)
+            covered += block.size
+        counts[self.fill] += self.rows * self.cols - covered
+        return counts.tolist()
+
+    def copy(self):
+        out = ChunkedGrid(self.rows, self.cols, self.chunk, self.fill)
+        out.chunks = {k: a.copy() for k, a in self.chunks.items()}
+        return out
+
+    @classmethod
+    def from_dense(cls, grid, chunk=MAP_CHUNK_TILES, fill=Tile.GRASS):
+        rows, cols = grid.shape
+        out = cls(rows, cols, chunk, fill)
+        for r0 in range(0, rows, chunk):
+            for c0 in range(0, cols, chunk):
+                part = grid[r0:r0+chunk, c0:c0+chunk]
+                if (part != fill).any():
+                    block = np.full((chunk, chunk), fill, dtype=np.uint8)
+                    block[:part.shape[0], :part.shape[1]] = part
+                    out.chunks[(r0 // chunk, c0 // chunk)] = block
+        return out
@@ -0,0 +1,183 @@
+# src/components.py
+
+from collections import deque
+import numpy as np
+from tile  import tile_ids
+from utils import neighbor_pairs
+from map   import NEIGHBORS
+
+REBUILD_RATIO = 4   # relabel all once edits would touch over 1/REBUILD_RATIO of the set
+
+class ComponentIndex:
+    """
+    Connected components of the tiles in one valid-tile set (e.g. roads, or
+    roads + houses), so "can I get there at all?" is a dict lookup instead
+    of a search that floods everything reachable before giving up.
+
+    Adding a tile merges the components around it (smaller ones are
+    relabelled into the largest). Removing one re-floods only the component
+    it belonged to, to find out whether it split. Big batches, and removals
+    from a component spanning much of the set, mark the index stale for
+    the next query to relabel in one pass.
+    """
+    def __init__(self, map_mgr, valid_tiles, goal_beside=False):
+        self.map_mgr = map_mgr
+        self.valid   = tile_ids(valid_tiles)
+        # True when trips may end next to an off-set goal (road-graph
+        # routing does); a grid search never steps onto one
+        self.goal_beside = goal_beside
+        self.label   = {}     # tile -> component id
+        self.members = {}     # component id -> set of tiles
+        self.next_id = 0
+        self.stale   = False  # set when edits were left for refresh()
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        if self.stale:
+            return
+        size = len(self.label)
+        if len(changes) * REBUILD_RATIO > size + len(changes):
+            self.stale = True
+            return
+        valid, flooded = self.valid, 0
+        for r, c, old, new in changes:
+            if (old in valid) == (new in valid):
+                continue
+            t = (r, c)
+            if new in valid:
+                self._add(t)
+                continue
+            flooded += len(self.members[self.label[t]])
+            if flooded * REBUILD_RATIO > size:
+                self.stale = True
+                return
+            self._remove(t)
+
+    def on_grid_reset(self, map_mgr):
+        self.stale = True
+
+    def refresh(self):
+        """Relabel the whole set now if edits left the index stale."""
+        if not self.stale:
+            return
+        self.stale = False
+        self.label.clear()
+        self.members.clear()
+        tiles = self.map_mgr.grid.positions(self.valid)
+        if not tiles:
+            return
+        rc = np.array(tiles, dtype=np.int64)
+        cols = self.map_mgr.cols
+        flat = np.sort(rc[:, 0] * cols + rc[:, 1])
+        roots = label_cells(flat, cols)
+        # ids in order of each component's first tile, as flooding sorted tiles gave
+        firsts, comp = np.unique(roots, return_inverse=True)
+        cells = list(zip(*(a.tolist() for a in np.divmod(flat, cols))))
+        base = self.next_id
+        self.next_id += len(firsts)
+        self.label = dict(zip(cells, (comp + base).tolist()))
+        order = np.argsort(comp, kind="stable")
+        bounds = np.searchsorted(comp[order], np.arange(len(firsts) + 1)).tolist()
+        order = order.tolist()
+        for k in range(len(firsts)):
+            self.members[base + k] = {cells[i] for i in order[bounds[k]:bounds[k+1]]}
+
+    # ——— Maintenance ————————————————————————————————————————————————————
+    def _new_id(self):
+        cid = self.next_id
+        self.next_id += 1
+        self.members[cid] = set()
+        return cid
+
+    def _flood(self, seed, allowed):
+        """Label everything connected to seed (within allowed) with a fresh id."""
+        cid  = self._new_id()
+        comp = self.members[cid]
+        comp.add(seed)
+        self.label[seed] = cid
+        queue = deque([seed])
+        while queue:
+            r, c = queue.popleft()
+            for dr, dc in NEIGHBORS:
+                n = (r+dr, c+dc)
+                if n in allowed and n not in comp:
+                    comp.add(n)
+                    self.label[n] = cid
+                    queue.append(n)
+        return comp
+
+    def _add(self, t):
+        around = {self.label[n] for n in self._neighbors(t) if n in self.label}
+        if not around:
+            cid = self._new_id()
+        else:
+            cid = max(around, key=lambda k: len(self.members[k]))
+            for other in around - {cid}:
+                moved = self.members.pop(other)
+                for m in moved:
+                    self.label[m] = cid
+                self.members[cid] |= moved
+        self.members[cid].add(t)
+        self.label[t] = cid
+
+    def _remove(self, t):
+        cid  = self.label.pop(t)
+        comp = self.members.pop(cid)
+        comp.discard(t)
+        # re-flood from each neighbour that isn't already covered
+        covered = 0
+        for n in self._neighbors(t):
+            if n in comp and self.label.get(n) == cid:
+                covered += len(self._flood(n, comp))
+                if covered == len(comp):
+                    break
+
+    def _neighbors(self, t):
+        r, c = t
+        return [(r+dr, c+dc) for dr, dc in NEIGHBORS]
+
+    # ——— Queries ————————————————————————————————————————————————————————
+    def components_at(self, t):
+        """Components usable from t: its own, or its neighbours' if t isn't in the set."""
+        self.refresh()
+        cid = self.label.get(t)
+        if cid is not None:
+            return {cid}
+        return {self.label[n] for n in self._neighbors(t) if n in self.label}
+
+    def reachable(self, start, goal):
+        self.refresh()
+        if self.goal_beside:
+            ends = self.components_at(goal)
+        else:
+            cid = self.label.get(goal)
+            if cid is None:
+                return False
+            ends = {cid}
+        return not self.components_at(start).isdisjoint(ends)
+
+
+def label_cells(flat, cols):
+    """
+    Connected components of the cells at sorted flat indexes (row*cols+col),
+    4-connected: for each cell, the position in flat of its component's
+    first cell. Union-find done a whole array at a time: every round hooks
+    each root onto the smallest root it borders, then halves every path
+    until each cell points straight at its root.
+    """
+    u, v = neighbor_pairs(flat, cols)
+    parent = np.arange(len(flat))
+    while len(u):
+        pu, pv = parent[u], parent[v]
+        split = pu != pv
+        u, v, pu, pv = u[split], v[split], pu[split], pv[split]
+        if not len(u):
+            break
+        np.minimum.at(parent, np.maximum(pu, pv), np.minimum(pu, pv))
+        while True:
+            up = parent[parent]
+            if np.array_equal(up, parent):
+                break
+            parent = up
+    return parent
@@ -4,6 +4,43 @@ TILE_SIZE = 16
 ROWS = SCREEN_HEIGHT // TILE_SIZE
 COLS = SCREEN_WIDTH // TILE_SIZE
 
+# simulation runs on fixed ticks; 60 ticks == 1 second of game time
+TICK_RATE = 60
+INCOME_INTERVAL_TICKS = 3 * TICK_RATE     # payout every 3s
+SIM_SPAWN_INTERVAL_TICKS = 5 * TICK_RATE  # new Sim every 5s
+MAX_TICKS_PER_FRAME = 5                   # catch-up cap for slow frames
+
+# tiles Sims and cars may travel over
+MOVE_IN_TILES = ("road", "house")             # walking to a new home
+WALK_TILES    = ("road", "house", "factory")  # commuting on foot
+DRIVE_TILES   = ("road",)                     # cars
+
+# background path solving
+PATH_WORKERS           = 2    # worker processes; 0 solves in-process
+PATH_REQUESTS_PER_TICK = 64   # most path searches started in one tick
+FLOW_FIELD_MIN_SHARED  = 8    # distinct trips through one endpoint before it gets a flow field
+FLOW_FIELD_CAPACITY    = 32   # most flow fields kept at once...
+FLOW_FIELD_BUDGET      = 64 << 20   # ...and most bytes they may take together (4 per map cell each)
+
+# parallel growth scan: only the zone-growth chunk scan runs on worker
+# processes (over shared-memory tiles), and only while map.GROWTH_INDEX_LIMIT
+# (20000) or more zone tiles border roads, e.g. after loading a big zoned city
+GROWTH_SCAN_WORKERS = 0       # processes; 0 keeps the scan in-process
+
+RENDER_CHUNK_TILES = 32   # tiles per side of a cached map render chunk
+AGENT_CELL_TILES   = 8    # tiles per side of an agent spatial-hash bucket
+AGENT_LOD_ZOOM     = 0.75 # below this zoom agents are drawn as per-bucket density dots
+
+# map storage
+MAP_CHUNK_TILES      = 64         # tiles per side of a stored map chunk
+DENSE_SEARCH_CELLS   = 1 << 22    # maps up to this many cells path-search the whole grid
+SEARCH_WINDOW_MARGIN = 32         # tiles around start/goal for a first windowed search
+
+# autosave: periodic checkpoint + journal of tile edits in between
+AUTOSAVE_FILE           = "autosave.tts"
+AUTOSAVE_INTERVAL_TICKS = 10 * TICK_RATE   # append new edits to the journal every 10s
+AUTOSAVE_COMPACT_EDITS  = 50000            # journal this long -> write a fresh checkpoint
+
 COLORS = {
     "grass": (34, 139, 34),
     "road": (128, 128, 128),
@@ -1,5 +1,5 @@
 # src/economy.py
-from config import TILE_SIZE
+from tile import Tile
 
 class Economy:
     def __init__(self, tax_rate=0.10):
@@ -11,10 +11,33 @@ class Economy:
         self.industrial_demand = 0
         self.happiness = 1.0
 
-    def update(self, grid):
-        # count tiles
-        houses = sum(row.count("house") for row in grid)
-        factories = sum(row.count("factory") for row in grid)
+        # running tile counts, kept current by MapManager change events
+        self.tile_counts = [0] * len(Tile)
+        self.verify = False   # debug: recount the grid every update and compare
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        counts = self.tile_counts
+        for _, _, old, new in changes:
+            counts[old] -= 1
+            counts[new] += 1
+
+    def on_grid_reset(self, map_mgr):
+        self.tile_counts = map_mgr.count_tiles()
+
+    @staticmethod
+    def count_tiles(grid):
+        return grid.count(len(Tile))
+
+    def update(self, grid=None):
+        # grid (a ChunkedGrid) is only read in verify mode; normal updates are O(1)
+        if self.verify and grid is not None:
+            full = self.count_tiles(grid)
+            if full != self.tile_counts:
+                raise RuntimeError(f"tile counts drifted: tracked {self.tile_counts}, grid {full}")
+
+        houses = self.tile_counts[Tile.HOUSE]
+        factories = self.tile_counts[Tile.FACTORY]
 
         self.population = houses * 10
         self.jobs = factories * 5
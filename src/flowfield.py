@@ -0,0 +1,223 @@
+# src/flowfield.py
+
+from collections import OrderedDict
+from array import array
+import numpy as np
+from config import (DENSE_SEARCH_CELLS, FLOW_FIELD_MIN_SHARED, FLOW_FIELD_CAPACITY,
+                    FLOW_FIELD_BUDGET)
+from tile   import tile_ids
+
+def distance_field(passable, rows, cols, root):
+    """
+    Steps from every cell to root over a flat passability mask (-1 where
+    root can't be reached), by breadth-first search one whole frontier at
+    a time. root itself needn't be passable, like an a_star start.
+    """
+    n = rows * cols
+    mask = np.frombuffer(passable, dtype=np.bool_)
+    dist = np.full(n, -1, dtype=np.int32)
+    dist[root] = 0
+    frontier = np.array([root], dtype=np.intp)
+    d = 0
+    while frontier.size:
+        d += 1
+        c = frontier % cols
+        nbs = np.concatenate((frontier[frontier >= cols] - cols,
+                              frontier[frontier < n - cols] + cols,
+                              frontier[c > 0] - 1,
+                              frontier[c < cols - 1] + 1))
+        nbs = nbs[mask[nbs]]
+        nbs = nbs[dist[nbs] < 0]
+        dist[nbs] = d
+        frontier = np.unique(nbs)
+    return dist
+
+def _downhill(dist, cols, cell):
+    """cell's neighbour one step closer to the root, or -1."""
+    r, c = divmod(cell, cols)
+    want = dist[cell] - 1
+    n = len(dist)
+    for nb, ok in ((cell - cols, r > 0), (cell + cols, cell + cols < n),
+                   (cell - 1, c > 0), (cell + 1, c < cols - 1)):
+        if ok and dist[nb] == want:
+            return nb
+    return -1
+
+def follow(dist, cols, cell):
+    """
+    Cells from cell down to the root, excluding cell and including the
+    root; [] if cell is the root or can't reach it. A cell off the field
+    (say an impassable start) steps onto its nearest reachable neighbour.
+    """
+    if dist[cell] == 0:
+        return []
+    if dist[cell] < 0:
+        r, c = divmod(cell, cols)
+        best = -1
+        for nb, ok in ((cell - cols, r > 0), (cell + cols, cell + cols < len(dist)),
+                       (cell - 1, c > 0), (cell + 1, c < cols - 1)):
+            if ok and dist[nb] >= 0 and (best < 0 or dist[nb] < dist[best]):
+                best = nb
+        if best < 0:
+            return []
+        path, cell = [best], best
+    else:
+        path = []
+    while dist[cell] > 0:
+        cell = _downhill(dist, cols, cell)
+        path.append(cell)
+    return path
+
+def _open(dist, passable, cols, cell):
+    """Patch a distance field for cell having become passable."""
+    n = len(dist)
+    def around(i):
+        r, c = divmod(i, cols)
+        if r > 0:          yield i - cols
+        if i + cols < n:   yield i + cols
+        if c > 0:          yield i - 1
+        if c < cols - 1:   yield i + 1
+    reached = [dist[nb] for nb in around(cell) if dist[nb] >= 0]
+    if not reached or (0 <= dist[cell] <= min(reached) + 1):
+        return
+    dist[cell] = min(reached) + 1
+    # breadth-first from cell, lowering whatever it now gives a shorter way
+    queue, i = [cell], 0
+    while i < len(queue):
+        cur = queue[i]; i += 1
+        d = dist[cur] + 1
+        for nb in around(cur):
+            if passable[nb] and (dist[nb] < 0 or dist[nb] > d):
+                dist[nb] = d
+                queue.append(nb)
+
+
+class FlowFields:
+    """
+    Shared shortest-path fields for popular endpoints, e.g. the edge road
+    every new Sim walks in from.
+
+    Once FLOW_FIELD_MIN_SHARED different trips have started or ended at
+    the same tile in the same travel mode, route() computes one distance
+    field rooted there and serves every later trip to or from that tile
+    by walking it: O(path length), no search. Paths are as short as
+    a_star's. Tiles that open up (a house grows next to a road) are
+    patched into the fields; when one of a mode's tiles is removed, that
+    mode's fields are dropped and rebuilt on the next trip that needs them.
+    At most `capacity` fields are kept, fewer if they'd take more than
+    `budget` bytes: each is a whole-map array.
+    """
+    def __init__(self, map_mgr, capacity=FLOW_FIELD_CAPACITY,
+                 min_shared=FLOW_FIELD_MIN_SHARED, budget=FLOW_FIELD_BUDGET):
+        self.map_mgr    = map_mgr
+        self.capacity   = capacity
+        self.budget     = budget
+        self.min_shared = min_shared
+        self.fields   = OrderedDict()   # (valid_key, root cell) -> int32 distances
+        self.hot      = set()           # (valid_key, root cell) worth a field
+        self.partners = {}              # (valid_key, tile) -> other ends of trips seen
+        self.built  = 0
+        self.served = 0
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        if not self.fields:
+            return
+        cols = self.map_mgr.cols
+        for valid_key in {valid_key for valid_key, _ in self.fields}:
+            opened, closed = [], False
+            for r, c, old, new in changes:
+                if (old in valid_key) == (new in valid_key):
+                    continue                     # no difference to this mode
+                if new in valid_key:
+                    opened.append(r * cols + c)
+                else:
+                    closed = True
+            if closed:
+                # a tile that may be on the way is gone: rebuild when next needed
+                for key in [key for key in self.fields if key[0] == valid_key]:
+                    del self.fields[key]
+            elif opened:
+                # new tiles only ever shorten trips, which can be patched locally
+                passable = self.map_mgr.passable(valid_key)
+                for key, dist in self.fields.items():
+                    if key[0] == valid_key:
+                        for cell in opened:
+                            _open(dist, passable, cols, cell)
+
+    def on_grid_reset(self, map_mgr):
+        self.fields.clear()
+        self.hot.clear()
+        self.partners.clear()
+
+    # ——— Routing ———————————————————————————————————————————————————————
+    def route(self, start, goal, valid_tiles):
+        """
+        Path like a_star(start, goal) if a field covers start or goal
+        (building it if the tile has become popular), else None.
+        """
+        m = self.map_mgr
+        if m.rows * m.cols > DENSE_SEARCH_CELLS or not self._room():
+            return None
+        valid_key = tile_ids(valid_tiles)
+        cols = m.cols
+        s, t = start[0] * cols + start[1], goal[0] * cols + goal[1]
+        for root in (t, s):
+            if (valid_key, root) not in self.hot:
+                self._count(valid_key, root, s + t - root)
+        for root, other in ((t, s), (s, t)):
+            if (valid_key, root) in self.hot:
+                return self._walk(valid_key, root, other, toward_root=root == t)
+        return None
+
+    def _count(self, valid_key, root, other):
+        seen = self.partners.setdefault((valid_key, root), set())
+        seen.add(other)
+        if len(seen) >= self.min_shared:
+            del self.partners[(valid_key, root)]
+            self.hot.add((valid_key, root))
+
+    def _walk(self, valid_key, root, other, toward_root):
+        if root == other:
+            return []
+        m, cols = self.map_mgr, self.map_mgr.cols
+        passable = m.passable(valid_key)
+        # a_star never enters an impassable goal
+        if not passable[root if toward_root else other]:
+            return []
+        dist = self._field(valid_key, root, passable)
+        self.served += 1
+        if toward_root:
+            cells = follow(dist, cols, other)
+        elif dist[other] < 0:
+            cells = []
+        else:
+            # the way back from other to root, reversed
+            cells = follow(dist, cols, other)[:-1][::-1] + [other]
+        return [divmod(i, cols) for i in cells]
+
+    def _field(self, valid_key, root, passable):
+        key = (valid_key, root)
+        dist = self.fields.get(key)
+        if dist is None:
+            m = self.map_mgr
+            # array('i') rather than numpy: follow() indexes it cell by cell
+            dist = array('i')
+            dist.frombytes(distance_field(passable, m.rows, m.cols, root).tobytes())
+            self.fields[key] = dist
+            self.built += 1
+            room = self._room()
+            while len(self.fields) > room:
+                old, _ = self.fields.popitem(last=False)
+                self.hot.discard(old)
+        self.fields.move_to_end(key)
+        return dist
+
+    def _room(self):
+        """Fields that fit: capacity, cut down to what the byte budget holds."""
+        m = self.map_mgr
+        return min(self.capacity, self.budget // (m.rows * m.cols * array('i').itemsize))
+
+    def stats(self):
+        return {"fields": len(self.fields), "built": self.built, "served": self.served}
@@ -1,14 +1,16 @@
-import pygame, json, random
-from config      import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, ROWS, COLS, COLORS
+import pygame
+from config      import (SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE,
+                         TICK_RATE, MAX_TICKS_PER_FRAME, PATH_WORKERS)
 from camera      import Camera
-from sim         import Sim
-from vehicle     import Vehicle
-from pathfinding import a_star
-from map         import MapManager
-from economy     import Economy
+from simulation  import Simulation
+from renderer    import TileRenderer, AgentRenderer
+from sim         import STATE_NAMES
+from profiler    import Profiler
+from utils       import rect_cells, line_cells
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, path_workers=None, autosave=True, load=None,
+                 profile_out=None):
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Casual City Builder")
@@ -16,24 +18,30 @@ class Game:
         self.running = True
 
         # ——— Core Systems ——————————————————————————————————————————————————
-        self.map_mgr = MapManager()                  # handles grid + outside road
-        self.econ    = Economy(tax_rate=0.10)        # handles pop/jobs/income
+        if path_workers is None:
+            path_workers = PATH_WORKERS
+        self.profiler    = Profiler()                # per-subsystem timings
+        self.profile_out = profile_out               # trace file written on exit
+        self.show_profile = False                    # F3 overlay
+        self.world   = Simulation(seed=seed, path_workers=path_workers,
+                                  profiler=self.profiler)  # map, economy, agents
+        if load:
+            self.world.load_game(load)
+        if autosave:
+            self.world.enable_autosave()             # checkpoint + edit journal
         self.camera  = Camera()                      # pan & zoom
+        self.renderer = TileRenderer(self.world.map_mgr)  # cached map chunks
+        self.agents   = AgentRenderer(self.world)         # on-screen Sims & vehicles
+        self.inspected = None                              # Sim picked with a right click
 
-        # ——— State ———————————————————————————————————————————————————————
-        self.claimed_homes = set()
-        self.claimed_jobs  = set()
-
-        self.money            = 1000
-        self.last_income_tick = pygame.time.get_ticks()
-        self.income_interval  = 3000  # payout every 3s
-
-        self.sims     = [ Sim(0,0,self) ]
-        self.vehicles = []
+        # fixed-timestep accumulator (ms of real time not yet simulated)
+        self.tick_ms     = 1000 / TICK_RATE
+        self.accumulator = 0.0
 
         # ——— Input / UI ————————————————————————————————————————————————————
         self.selected_tool   = "road"
         self.dragging        = False
+        self.build_from      = None   # tile where a left-button build drag started
         self.last_mouse_pos  = (0,0)
 
         self.font           = pygame.font.SysFont(None,24)
@@ -47,52 +55,6 @@ class Game:
             "bulldozer":        pygame.Rect(530, SCREEN_HEIGHT-self.toolbar_height+5,  90,30),
         }
 
-    def find_nearest_tile(self, tile_type, start_x, start_y, occupied_check=False):
-        """
-        Delegate to MapManager.find_nearest, honoring claimed homes/jobs
-        so Sims don’t re-take the same house or factory.
-        """
-        claimed = set()
-        if occupied_check:
-            if tile_type == "house":
-                claimed = self.claimed_homes
-            elif tile_type == "factory":
-                claimed = self.claimed_jobs
-        # MapManager.find_nearest signature: (tile_type, start_x, start_y, claimed_set)
-        return self.map_mgr.find_nearest(tile_type, start_x, start_y, claimed)
-
-
-    # ——— Vehicle spawning —————————————————————————————————————————————
-    def spawn_vehicle(self, tx, ty, target):
-        if not (isinstance(target, tuple) and len(target)==2):
-            print("🚨 Invalid vehicle target:", target)
-            return None
-
-        path = a_star(self.map_mgr.grid, (ty,tx), target, valid_tiles=["road"])
-        if path and all(isinstance(p,tuple) and len(p)==2 for p in path):
-            # world coords in pixels
-            start_x = tx * TILE_SIZE
-            start_y = ty * TILE_SIZE
-            v = Vehicle(start_x, start_y, path, vehicle_type="car",
-                        on_arrival=lambda v:self.on_vehicle_arrival(v))
-            self.vehicles.append(v)
-            return v
-        else:
-            print("🚨 Invalid vehicle path:", path)
-        return None
-
-    def on_vehicle_arrival(self, vehicle):
-        # when a vehicle finishes, free the Sim and despawn
-        for sim in self.sims:
-            if sim.vehicle is vehicle:
-                sim.in_vehicle = False
-                sim.vehicle    = None
-                # place sim at tile of last path step
-                if vehicle.path:
-                    y,x = vehicle.path[-1]
-                    sim.tile_y, sim.tile_x = y,x
-        # vehicle.alive will be False → cleaned up in update()
-
      # ——— Input Handling —————————————————————————————————————————————
     def handle_events(self):
         mx, my = pygame.mouse.get_pos()
@@ -110,50 +72,26 @@ class Game:
                     self.dragging = True
                     self.last_mouse_pos = (mx, my)
 
+                elif ev.button == 3:
+                    # inspect the Sim under the cursor (or stop inspecting)
+                    near = self.world.sims_at(row, col, radius=1)
+                    self.inspected = near[0] if near else None
+
                 elif my >= SCREEN_HEIGHT - self.toolbar_height:
                     for tool, rect in self.toolbar_buttons.items():
                         if rect.collidepoint(mx, my):
                             self.selected_tool = tool
 
-                elif 0 <= row < ROWS and 0 <= col < COLS:
-                    t = self.map_mgr.get(row, col)
-
-                    # road
-                    if self.selected_tool == "road" and t == "grass" and self.money >= 10:
-                        self.map_mgr.set_tile(row, col, "road")
-                        self.money -= 10
-
-                    # house
-                    elif self.selected_tool == "house" and t == "grass":
-                        if any(
-                            0 <= row + dr < ROWS and 0 <= col + dc < COLS and self.map_mgr.get(row + dr, col + dc) == "road"
-                            for dr, dc in [(-1,0), (1,0), (0,-1), (0,1)]
-                        ) and self.money >= 25:
-                            self.map_mgr.set_tile(row, col, "house")
-                            self.money -= 25
-
-                    # factory
-                    elif self.selected_tool == "factory" and t == "grass":
-                        if any(
-                            0 <= row + dr < ROWS and 0 <= col + dc < COLS and self.map_mgr.get(row + dr, col + dc) == "road"
-                            for dr, dc in [(-1,0), (1,0), (0,-1), (0,1)]
-                        ) and self.money >= 40:
-                            self.map_mgr.set_tile(row, col, "factory")
-                            self.money -= 40
-
-                    # zoning
-                    elif self.selected_tool == "zone_residential" and t == "grass":
-                        self.map_mgr.set_tile(row, col, "zone_residential")
-                    elif self.selected_tool == "zone_industrial" and t == "grass":
-                        self.map_mgr.set_tile(row, col, "zone_industrial")
-
-                    # bulldozer
-                    elif self.selected_tool == "bulldozer" and t != "grass":
-                        self.map_mgr.set_tile(row, col, "grass")
+                elif ev.button == 1:
+                    self.build_from = (row, col)
 
             elif ev.type == pygame.MOUSEBUTTONUP:
                 if ev.button == 2:
                     self.dragging = False
+                elif ev.button == 1 and self.build_from is not None:
+                    # a click builds one tile, a drag a whole line or rectangle
+                    self.world.apply_tool_cells(self.selected_tool, self.drag_cells(row, col))
+                    self.build_from = None
 
             elif ev.type == pygame.MOUSEMOTION and self.dragging:
                 cx, cy = pygame.mouse.get_pos()
@@ -164,10 +102,15 @@ class Game:
                 self.last_mouse_pos = (cx, cy)
 
             elif ev.type == pygame.KEYDOWN:
-                if ev.key == pygame.K_s:
-                    self.save_map()
+                if ev.key == pygame.K_F3:
+                    self.show_profile = not self.show_profile
+                elif ev.key == pygame.K_F4:
+                    self.profiler.export(self.profile_out or "profile.json")
+                elif ev.key == pygame.K_s:
+                    self.world.save_game(background=True)
                 elif ev.key == pygame.K_l:
-                    self.load_map()
+                    self.world.load_game()
+                    self.inspected = None
                 elif ev.key == pygame.K_w:
                     self.camera.y -= 20 / self.camera.zoom
                 elif ev.key == pygame.K_s:
@@ -178,79 +121,56 @@ class Game:
                     self.camera.x += 20 / self.camera.zoom
 
 
-    # ——— Save / Load —————————————————————————————————————————————————
-    def save_map(self, fn="map.json"):
-        with open(fn,"w") as f:
-            json.dump(self.map_mgr.grid,f)
-    def load_map(self,fn="map.json"):
-        try:
-            with open(fn,"r") as f:
-                self.map_mgr.grid=json.load(f)
-        except FileNotFoundError:
-            print("No saved map.")
+    def drag_cells(self, row, col):
+        """Tiles a build drag from build_from to (row, col) covers: roads run in lines."""
+        r0, c0 = self.build_from
+        if self.selected_tool == "road":
+            return line_cells(r0, c0, row, col)
+        return rect_cells(r0, c0, row, col)
 
     # ——— Main update loop —————————————————————————————————————————————
-    def update(self):
-        now = pygame.time.get_ticks()
-
-        # economy & zoning
-        self.econ.update(self.map_mgr.grid)
-        self.map_mgr.grow_zones(self.econ.residential_demand,
-                                self.econ.industrial_demand)
-
-        # payout
-        if now-self.last_income_tick>self.income_interval:
-            self.money   += self.econ.income
-            self.econ.income=0
-            self.last_income_tick=now
-
-        # Sims & Vehicles
-        for sim in self.sims:       sim.update()
-        for v in self.vehicles[:]:
-            v.update()
-            if not v.alive:        self.vehicles.remove(v)
-
-        # spawn new Sim every ~5s
-        if now%5000<50:
-            self.spawn_sim()
-
-    # ——— Edge‐road Sim spawning —————————————————————————————————————
-    def spawn_sim(self):
-        edges=[]
-        # top/bottom
-        for c in range(COLS):
-            if self.map_mgr.get(0,c)=="road":      edges.append((c,0))
-            if self.map_mgr.get(ROWS-1,c)=="road": edges.append((c,ROWS-1))
-        # left/right
-        for r in range(ROWS):
-            if self.map_mgr.get(r,0)=="road":      edges.append((0,r))
-            if self.map_mgr.get(r,COLS-1)=="road": edges.append((COLS-1,r))
-        if edges:
-            tx,ty = random.choice(edges)
-            self.sims.append(Sim(tx,ty,self))
+    def update(self, dt_ms):
+        # run whole ticks for the real time that passed; drop the backlog
+        # instead of spiralling if a frame took far too long
+        self.accumulator += dt_ms
+        ticks = int(self.accumulator // self.tick_ms)
+        self.accumulator -= ticks * self.tick_ms
+        if ticks > MAX_TICKS_PER_FRAME:
+            ticks = MAX_TICKS_PER_FRAME
+            self.accumulator = 0.0
+        self.world.step(ticks)
 
     # ——— Render everything —————————————————————————————————————————————
     def draw(self):
+        world = self.world
+        prof  = self.profiler
         self.screen.fill((0,0,0))
         # tiles
-        for r in range(ROWS):
-            for c in range(COLS):
-                t = self.map_mgr.get(r,c)
-                col = COLORS.get(t,(255,0,255))
-                sx,sy = self.camera.apply((c*TILE_SIZE,r*TILE_SIZE))
-                s = round(TILE_SIZE*self.camera.zoom)
-                pygame.draw.rect(self.screen,col,(round(sx),round(sy),s,s))
+        with prof.section("draw tiles"):
+            self.renderer.draw(self.screen,self.camera)
 
         # agents
-        for sim in self.sims:       sim.draw(self.screen,self.camera)
-        for v   in self.vehicles:   v.draw(self.screen,self.camera)
+        with prof.section("draw agents"):
+            self.agents.draw(self.screen,self.camera)
 
         # hover highlight
         mx,my = pygame.mouse.get_pos()
         tx,ty = self.camera.world_to_tile(mx,my,TILE_SIZE)
-        if 0<=ty<ROWS and 0<=tx<COLS:
+        s = round(TILE_SIZE*self.camera.zoom)
+        if self.build_from is not None:
+            # preview of what releasing the button will build
+            cells = self.drag_cells(ty,tx)
+            if self.selected_tool != "road":
+                (r0,c0),(r1,c1) = cells[0],cells[-1]
+                sx,sy = self.camera.apply((c0*TILE_SIZE,r0*TILE_SIZE))
+                pygame.draw.rect(self.screen,(255,255,0),
+                                 (round(sx),round(sy),s*(c1-c0+1),s*(r1-r0+1)),2)
+            else:
+                for r,c in cells:
+                    sx,sy = self.camera.apply((c*TILE_SIZE,r*TILE_SIZE))
+                    pygame.draw.rect(self.screen,(255,255,0),(round(sx),round(sy),s,s),1)
+        elif world.map_mgr.in_bounds(ty,tx):
             sx,sy = self.camera.apply((tx*TILE_SIZE,ty*TILE_SIZE))
-            s = round(TILE_SIZE*self.camera.zoom)
             pygame.draw.rect(self.screen,(255,255,0),(round(sx),round(sy),s,s),2)
 
         # toolbar
@@ -262,25 +182,51 @@ class Game:
 
         # status + econ
         zx = f"Zoom: {self.camera.zoom:.2f}x"
-        st = self.font.render(f"Money:${self.money} | Tool:{self.selected_tool} | {zx}",True,(255,255,255))
+        st = self.font.render(f"Money:${world.money} | Tool:{self.selected_tool} | {zx}",True,(255,255,255))
         self.screen.blit(st,(10,SCREEN_HEIGHT-self.toolbar_height+35))
         eco = self.font.render(
-            f"Pop:{self.econ.population} Jobs:{self.econ.jobs} Inc:${self.econ.income} "
-            f"Tax:{int(self.econ.tax_rate*100)}% R-D:{self.econ.residential_demand} "
-            f"I-D:{self.econ.industrial_demand}",
+            f"Pop:{world.econ.population} Jobs:{world.econ.jobs} Inc:${world.econ.income} "
+            f"Tax:{int(world.econ.tax_rate*100)}% R-D:{world.econ.residential_demand} "
+            f"I-D:{world.econ.industrial_demand}",
             True, (255,255,255)
 )
         self.screen.blit(eco,(10,SCREEN_HEIGHT-self.toolbar_height-25))
 
+        if self.inspected is not None:
+            self.draw_inspector(self.inspected)
+
+        if self.show_profile:
+            prof.draw(self.screen, self.font)
+
         pygame.display.flip()
 
+    def draw_inspector(self, sim):
+        if sim.vehicle is None:
+            # ring around the Sim so it can be followed on screen
+            sx, sy = self.camera.apply(((sim.tile_x + 0.5) * TILE_SIZE, (sim.tile_y + 0.5) * TILE_SIZE))
+            pygame.draw.circle(self.screen, (255,255,0), (round(sx), round(sy)), 8, 2)
+        lines = [f"Sim at ({sim.tile_y},{sim.tile_x})  {STATE_NAMES[sim.state]}",
+                 f"home:{sim.home}  job:{sim.job}",
+                 f"vehicle:{sim.vehicle}  path:{len(sim.path) - sim.path_i} tiles left"]
+        for i, line in enumerate(lines):
+            txt = self.font.render(line, True, (255,255,255))
+            self.screen.blit(txt, (SCREEN_WIDTH - 330, 10 + i * 20))
+
     # ——— Main loop ————————————————————————————————————————————————————
     def run(self):
+        prof = self.profiler
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
+            dt = self.clock.tick(60)
+            with prof.section("frame"):
+                with prof.section("events"):
+                    self.handle_events()
+                with prof.section("update"):
+                    self.update(dt)
+                self.draw()
+            prof.next_frame()
+        self.world.close()
+        if self.profile_out:
+            prof.export(self.profile_out)
         pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+# src/growthscan.py
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from config import GROWTH_SCAN_WORKERS
+from chunks import ChunkedGrid
+from map    import grow_band
+
+class GrowthScanPool:
+    """
+    Runs the chunk scan of zone growth (MapManager._grow_zones_scan, used
+    while the frontier is too big to index) for bands of the map on worker
+    processes. Nothing else is parallelised here: Sims, vehicles and path
+    searches run as they would without a pool.
+
+    The stored map chunks are mirrored into slots of one shared-memory
+    array, which every worker maps, so a tick only ships chunk lists, slot
+    numbers and a seed over and lists of grown tiles back. The mirror is
+    sparse like the map itself, is only made once the scan first runs, and
+    only the chunks edited since the last scan are copied into it (edits
+    are noted as a MapManager listener). Bands are handed out in contiguous
+    runs and their results gathered in band order; since each band seeds
+    its own generator, the map ends up exactly as the in-process scan would
+    leave it for the same seed.
+    """
+    def __init__(self, map_mgr, workers=GROWTH_SCAN_WORKERS):
+        self.map_mgr = map_mgr
+        self.workers = workers
+        self.pool    = None       # (re)started with the shared array
+        self.shm     = None
+        self.tiles   = None       # (capacity, chunk, chunk) view of self.shm
+        self.slots   = {}         # chunk key -> slot in self.tiles
+        self.free    = []         # slots of chunks that no longer exist
+        self.dirty   = set()      # chunk keys edited since the last sync
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        if self.tiles is None:
+            return                # nothing mirrored yet
+        C = self.map_mgr.grid.chunk
+        self.dirty.update((r // C, c // C) for r, c, _, _ in changes)
+
+    def on_grid_reset(self, map_mgr):
+        self.slots.clear()
+        self.free.clear()
+        self.dirty.clear()
+        if self.tiles is not None:
+            self.free = list(range(len(self.tiles)))[::-1]
+            self.dirty = set(map_mgr.grid.chunks)
+
+    # ——— Mirror ————————————————————————————————————————————————————————
+    def _sync(self):
+        """Bring the mirror up to date with the map's stored chunks."""
+        grid = self.map_mgr.grid
+        if self.tiles is None or self.tiles.shape[1] != grid.chunk or \
+           len(grid.chunks) > len(self.tiles):
+            self._share(grid.chunk, max(2 * len(grid.chunks), 16))
+        for key in self.dirty:
+            block = grid.chunks.get(key)
+            slot = self.slots.get(key)
+            if block is None:
+                if slot is not None:          # bulldozed back to nothing
+                    del self.slots[key]
+                    self.free.append(slot)
+                continue
+            if slot is None:
+                slot = self.slots[key] = self.free.pop()
+            self.tiles[slot] = block
+        self.dirty.clear()
+
+    def _share(self, chunk, capacity):
+        self.close()
+        self.shm   = shared_memory.SharedMemory(create=True, size=capacity * chunk * chunk)
+        self.tiles = np.ndarray((capacity, chunk, chunk), dtype=np.uint8, buffer=self.shm.buf)
+        self.slots = {}
+        self.free  = list(range(capacity))[::-1]
+        self.dirty = set(self.map_mgr.grid.chunks)
+
+    # ——— Growth ————————————————————————————————————————————————————————
+    def grow(self, bands, wanted, seed):
+        """grow_band() for every {chunk_row: [chunk_col, ...]} in bands, in band order."""
+        self._sync()
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_attach,
+                                            initargs=(self.shm.name, self.tiles.shape))
+        grid = self.map_mgr.grid
+        items = list(bands.items())
+        # contiguous runs of about equal chunk counts, one per worker
+        total = sum(len(ccs) for _, ccs in items)
+        runs, run, size = [], [], 0
+        for item in items:
+            run.append(item)
+            size += len(item[1])
+            if size * self.workers >= total * (len(runs) + 1):
+                runs.append(run)
+                run = []
+        if run:
+            runs.append(run)
+        futures = []
+        for run in runs:
+            # a band reads the chunk rows next to it too, for the road halo
+            rows = {cr + d for cr, _ in run for d in (-1, 0, 1)}
+            slots = {key: slot for key, slot in self.slots.items() if key[0] in rows}
+            futures.append(self.pool.submit(_grow_run, grid.shape, grid.chunk, slots,
+                                            run, wanted, seed))
+        return [result for f in futures for result in f.result()]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shm is not None:
+            self.tiles = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+# ——— Worker side ——————————————————————————————————————————————————————
+_shared = None   # (SharedMemory, slot array) in each worker
+
+def _attach(name, shape):
+    global _shared
+    shm = shared_memory.SharedMemory(name=name)
+    _shared = (shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+
+def _grow_run(shape, chunk, slots, run, wanted, seed):
+    # the mirrored chunks seen as a ChunkedGrid, so windows read exactly as in-process
+    grid = ChunkedGrid(shape[0], shape[1], chunk=chunk)
+    tiles = _shared[1]
+    grid.chunks = {key: tiles[slot] for key, slot in slots.items()}
+    return [grow_band(grid.window, shape, chunk, cr, ccs, wanted, seed) for cr, ccs in run]
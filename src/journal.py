@@ -0,0 +1,154 @@
+# src/journal.py
+
+"""
+Journal files sit next to their checkpoint as <root>.<id>.journal:
+
+  header   magic "TTJL", format version, this journal's id, the id of the
+           journal it follows (0 if none)
+  records  (row, col, old tile id, new tile id), appended as edits happen
+
+A checkpoint's metadata names the journal that continues it. A journal
+whose predecessor is that one continues it in turn: that chain only
+exists when the game stopped while a newer checkpoint was still being
+written, and replaying it recovers the edits made meanwhile.
+"""
+
+import glob, os, struct, threading, time
+import savefile
+from config import AUTOSAVE_FILE, AUTOSAVE_COMPACT_EDITS
+
+MAGIC          = b"TTJL"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHQQ")
+_RECORD = struct.Struct("<iiBB")
+
+def journal_path(save_fn, journal_id):
+    return f"{os.path.splitext(save_fn)[0]}.{journal_id}.journal"
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        return None
+    magic, version, jid, prev = _HEADER.unpack(raw)
+    if magic != MAGIC or version > FORMAT_VERSION:
+        return None
+    return jid, prev
+
+class Autosave:
+    """
+    Keeps fn recoverable at all times for the cost of the edits made.
+
+    Listens to MapManager and packs every tile change into a buffer that
+    flush() appends to the current journal. Once the journal holds
+    `compact_after` edits (or after a load replaced the whole map), flush()
+    writes a fresh checkpoint in the background instead and starts a new,
+    empty journal.
+    """
+    def __init__(self, world, fn=AUTOSAVE_FILE, compact_after=AUTOSAVE_COMPACT_EDITS):
+        self.world  = world
+        self.fn     = fn
+        self.compact_after = compact_after
+        self.journal_id = None        # None: no checkpoint covers the current map yet
+        self.pending = bytearray()    # packed records not written yet
+        self.records = 0              # edits in the current journal, written or not
+        self.writer  = None           # thread writing the latest checkpoint
+        world.map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        if self.journal_id is None:
+            return                    # the next checkpoint will include them
+        pack = _RECORD.pack
+        for r, c, old, new in changes:
+            self.pending += pack(r, c, old, new)
+        self.records += len(changes)
+
+    def on_grid_reset(self, map_mgr):
+        self.pending.clear()
+        self.journal_id = None
+
+    # ——— Writing ————————————————————————————————————————————————————————
+    def flush(self):
+        """Append buffered edits to the journal, or checkpoint if it's due."""
+        if self.journal_id is None or self.records >= self.compact_after:
+            self.checkpoint()
+        else:
+            self._append()
+
+    def _append(self):
+        if not self.pending:
+            return
+        with open(journal_path(self.fn, self.journal_id), "ab") as f:
+            f.write(self.pending)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending.clear()
+
+    def checkpoint(self):
+        """
+        Snapshot the world now and write it on a thread. The old journal is
+        completed first and only deleted once the new checkpoint is on disk.
+        """
+        self.wait()
+        prev = self.journal_id or 0
+        if prev:
+            self._append()
+        jid = time.time_ns()
+        with open(journal_path(self.fn, jid), "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, jid, prev))
+        savefile.release(self.world, self.fn)
+        snap = savefile.snapshot(self.world, extra={"journal_id": jid})
+        self.journal_id = jid
+        self.records = 0
+
+        def write():
+            try:
+                savefile.write(self.fn, snap)
+            except OSError as e:
+                print(f"🚨 Autosave to {self.fn} failed: {e}")
+                return
+            for path in glob.glob(journal_path(self.fn, "*")):
+                if path != journal_path(self.fn, jid):
+                    os.remove(path)
+        self.writer = threading.Thread(target=write, daemon=True)
+        self.writer.start()
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+    def close(self):
+        self.flush()
+        self.wait()
+
+# ——— Replay ———————————————————————————————————————————————————————————
+def replay(map_mgr, save_fn, journal_id):
+    """
+    Re-apply the journal chain starting at journal_id to a freshly loaded
+    map. Returns the number of edits applied; stops early (with a warning)
+    if a record doesn't match the map, i.e. the journal belongs elsewhere.
+    """
+    headers = {}
+    for path in glob.glob(journal_path(save_fn, "*")):
+        h = _read_header(path)
+        if h is not None:
+            headers[h[0]] = (h[1], path)
+    follows = {prev: jid for jid, (prev, _) in headers.items()}
+
+    applied = 0
+    jid = journal_id
+    while jid in headers:
+        with open(headers[jid][1], "rb") as f:
+            data = f.read()[_HEADER.size:]
+        usable = len(data) - len(data) % _RECORD.size   # drop a torn last record
+        for r, c, old, new in _RECORD.iter_unpack(data[:usable]):
+            if not map_mgr.in_bounds(r, c) or map_mgr.get_id(r, c) != old:
+                print(f"🚨 Journal {headers[jid][1]} doesn't match the map; stopped replaying.")
+                return applied
+            map_mgr.set_tile(r, c, new)
+            applied += 1
+        jid = follows.get(jid)
+    return applied
@@ -1,5 +1,58 @@
-from game import Game
+import argparse, time
+
+def run_headless(ticks, seed, path_workers, rows=None, cols=None, profile_out=None,
+                 growth_workers=0):
+    from config import ROWS, COLS
+    from simulation import Simulation
+    from profiler import Profiler
+    prof  = Profiler(enabled=profile_out is not None)
+    world = Simulation(rows or ROWS, cols or COLS, seed=seed, path_workers=path_workers,
+                       profiler=prof, growth_workers=growth_workers)
+    t0 = time.perf_counter()
+    try:
+        for _ in range(ticks):
+            world.step()
+            prof.next_frame()
+    finally:
+        world.close()
+    dt = time.perf_counter() - t0
+    print(f"{ticks} ticks in {dt:.2f}s ({ticks/max(dt,1e-9):.0f} ticks/s) | "
+          f"sims:{len(world.sims)} vehicles:{len(world.vehicles)} money:${world.money}")
+    print("path cache:", world.paths.stats())
+    print("path requests:", world.path_requests.stats())
+    if profile_out:
+        prof.export(profile_out)
+        for name, s in sorted(prof.summary().items()):
+            print(f"  {name:16s} p50 {s['p50']:8.3f}  p95 {s['p95']:8.3f}  p99 {s['p99']:8.3f}  {s['unit']}")
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    parser = argparse.ArgumentParser(description="Tiletopia city builder")
+    parser.add_argument("--headless", type=int, metavar="TICKS",
+                        help="run the simulation for TICKS ticks without a window")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=None, help="headless map height in tiles")
+    parser.add_argument("--cols", type=int, default=None, help="headless map width in tiles")
+    parser.add_argument("--load", metavar="FILE",
+                        help="start from a binary save, e.g. autosave.tts after a crash")
+    parser.add_argument("--no-autosave", action="store_true")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write per-subsystem timings to FILE (.csv or .json) on exit")
+    parser.add_argument("--path-workers", type=int, default=None,
+                        help="path search processes (0 = solve in-process)")
+    parser.add_argument("--growth-workers", type=int, default=0,
+                        help="headless: processes for the zone-growth chunk scan, which "
+                             "only runs while 20000+ zone tiles border roads "
+                             "(same results as 0 for a given seed)")
+    args = parser.parse_args()
+
+    if args.headless is not None:
+        from config import PATH_WORKERS
+        workers = PATH_WORKERS if args.path_workers is None else args.path_workers
+        run_headless(args.headless, args.seed, workers, args.rows, args.cols, args.profile,
+                     args.growth_workers)
+    else:
+        from game import Game
+        game = Game(seed=args.seed, path_workers=args.path_workers,
+                    autosave=not args.no_autosave, load=args.load,
+                    profile_out=args.profile)
+        game.run()
@@ -1,57 +1,344 @@
 # src/map.py
 
 import random
+import numpy as np
 from config import ROWS, COLS
+from tile   import Tile, TILE_NAMES, TILE_IDS, tile_id, tile_ids
+from utils  import binomial
+from chunks import ChunkedGrid
+from pathfinding import passable_mask
+
+NEIGHBORS = [(-1,0),(1,0),(0,-1),(0,1)]
+
+GROWTH_CHANCE = 0.01   # per growable zone tile per tick
+GROWTH_INDEX_LIMIT = 20000   # frontier size from which a reload scans chunks instead of indexing
+BATCH_REBUILD_PER_CHUNK = 100   # set_tiles touching more cells per stored chunk re-derives the frontier in one pass
+ZONE_BUILDINGS = {Tile.ZONE_RESIDENTIAL: Tile.HOUSE,
+                  Tile.ZONE_INDUSTRIAL:  Tile.FACTORY}
 
 class MapManager:
-    def __init__(self):
-        self.grid = [["grass" for _ in range(COLS)] for _ in range(ROWS)]
+    def __init__(self, rows=ROWS, cols=COLS, rng=None):
+        self.rows = rows
+        self.cols = cols
+        self.rng  = rng or random.Random()
+        # one uint8 Tile id per cell, stored in chunks that exist once built on
+        self.grid = ChunkedGrid(rows, cols)
+        self.listeners = []
+        self.version   = 0     # bumped on every edit; lets caches spot stale data
+        self.masks     = {}    # valid tile ids -> flat passability bytearray
+        # zone tiles next to a road, per zone type: what grow_zones samples from
+        # (None while too big to index; grow_zones then scans the zoned chunks)
+        self.growable  = {zone: set() for zone in ZONE_BUILDINGS}
+        self.growth_pool = None  # growthscan.GrowthScanPool: the growth scan on other processes
         self.place_outside_connection()
 
     def place_outside_connection(self):
-        edge = random.choice(['top','bottom','left','right'])
+        edge = self.rng.choice(['top','bottom','left','right'])
         if edge=='top':
-            c = random.randrange(COLS);   self.grid[0][c] = "road"
+            c = self.rng.randrange(self.cols);   self.grid[0, c] = Tile.ROAD
         elif edge=='bottom':
-            c = random.randrange(COLS);   self.grid[ROWS-1][c] = "road"
+            c = self.rng.randrange(self.cols);   self.grid[self.rows-1, c] = Tile.ROAD
         elif edge=='left':
-            r = random.randrange(ROWS);   self.grid[r][0] = "road"
+            r = self.rng.randrange(self.rows);   self.grid[r, 0] = Tile.ROAD
         else:
-            r = random.randrange(ROWS);   self.grid[r][COLS-1] = "road"
+            r = self.rng.randrange(self.rows);   self.grid[r, self.cols-1] = Tile.ROAD
 
+    def in_bounds(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    # ——— Tile access ———————————————————————————————————————————————————
     def get(self, row, col):
-        return self.grid[row][col]
+        """Tile name at (row, col), e.g. "road"."""
+        return TILE_NAMES[self.grid[row, col]]
+
+    def get_id(self, row, col):
+        return int(self.grid[row, col])
 
     def set_tile(self, row, col, tile):
-        self.grid[row][col] = tile
+        """tile may be a name ("house") or a Tile id."""
+        new = tile_id(tile)
+        old = int(self.grid[row, col])
+        if old == new:
+            return
+        self.grid[row, col] = new
+        self.version += 1
+        if self.masks:
+            i = row * self.cols + col
+            for key, mask in self.masks.items():
+                mask[i] = new in key
+        if old == Tile.ROAD or new == Tile.ROAD:
+            for dr, dc in NEIGHBORS:
+                self._refresh_growable(row+dr, col+dc)
+        self._refresh_growable(row, col)
+        self._notify([(row, col, old, new)])
+
+    def set_tiles(self, edits):
+        """
+        Apply many edits [(row, col, tile), ...] as one: the last write to
+        a cell wins, cells off the map are dropped, derived state is
+        refreshed once, and listeners get a single on_tiles_changed carrying
+        every cell that really changed. Returns that change list.
+        """
+        final = {}
+        for r, c, tile in edits:
+            final[(r, c)] = tile
+        if not final:
+            return []
+        ids = {tile: tile_id(tile) for tile in set(final.values())}
+        rs, cs = (np.array(a, dtype=np.int64) for a in zip(*final))
+        new_ids = np.array([ids[t] for t in final.values()], dtype=np.uint8)
+        inside = (rs >= 0) & (rs < self.rows) & (cs >= 0) & (cs < self.cols)
+        if not inside.all():
+            rs, cs, new_ids = rs[inside], cs[inside], new_ids[inside]
+            if not len(rs):
+                return []
+        old_ids = self.grid.scatter(rs, cs, new_ids)
+        hit = old_ids != new_ids
+        if not hit.any():
+            return []
+        rs, cs, old_ids, new_ids = rs[hit], cs[hit], old_ids[hit], new_ids[hit]
+        changes = list(zip(rs.tolist(), cs.tolist(), old_ids.tolist(), new_ids.tolist()))
+        self.version += 1
+        flat = rs * self.cols + cs
+        for key, mask in self.masks.items():
+            np.frombuffer(mask, dtype=np.uint8)[flat] = np.isin(new_ids, list(key))
+        # the same neighbourhood refresh set_tile does, or one rebuild for
+        # batches big enough that it costs less than the per-cell refreshes
+        road = (old_ids == Tile.ROAD) | (new_ids == Tile.ROAD)
+        rr = np.concatenate([rs] + [rs[road] + dr for dr, _ in NEIGHBORS])
+        cc = np.concatenate([cs] + [cs[road] + dc for _, dc in NEIGHBORS])
+        inside = (rr >= 0) & (rr < self.rows) & (cc >= 0) & (cc < self.cols)
+        touched = np.unique(rr[inside] * self.cols + cc[inside])
+        if len(touched) > BATCH_REBUILD_PER_CHUNK * len(self.grid.chunks):
+            self._rebuild_growable()
+        else:
+            for r, c in zip(*(a.tolist() for a in np.divmod(touched, self.cols))):
+                self._refresh_growable(r, c)
+        self._notify(changes)
+        return changes
+
+    # ——— Change events —————————————————————————————————————————————————
+    def add_listener(self, listener):
+        """
+        Subscribe to tile changes. A listener implements
+          on_tiles_changed(changes)  -- list of (row, col, old_id, new_id)
+          on_grid_reset(map_mgr)     -- whole grid replaced (load)
+        and is synced to the current grid right away.
+        """
+        self.listeners.append(listener)
+        listener.on_grid_reset(self)
+
+    def _notify(self, changes):
+        for l in self.listeners:
+            l.on_tiles_changed(changes)
+
+    def _reset(self):
+        for l in self.listeners:
+            l.on_grid_reset(self)
+
+    def passable(self, valid_tiles):
+        """
+        Flat bytearray (index row*cols+col) marking tiles in valid_tiles.
+        Built once per tile set, then patched by set_tile(). Whole-map, so
+        only meant for maps up to DENSE_SEARCH_CELLS.
+        """
+        key  = tile_ids(valid_tiles)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = passable_mask(self.grid.to_dense(), key)
+        return mask
+
+    # ——— Bulk access ———————————————————————————————————————————————————
+    def iter_chunks(self):
+        """(row0, col0, block) for every stored chunk; the rest of the map is grass."""
+        return self.grid.iter_chunks()
+
+    def positions(self, tiles):
+        """All (row, col) holding one of tiles (names or ids), grass excluded."""
+        return self.grid.positions(tile_ids(tiles))
+
+    def count_tiles(self):
+        """Tiles of each type, indexed by Tile id."""
+        return self.grid.count(len(Tile))
 
-    def find_nearest(self, tile_type, start_x, start_y, claimed=None):
+    def to_names(self):
+        """Grid as nested lists of tile names (the JSON save layout)."""
+        return [[TILE_NAMES[t] for t in row] for row in self.grid.to_dense().tolist()]
+
+    def load_names(self, names):
+        """Replace the grid from nested lists of tile names."""
+        self.load_grid(np.array([[TILE_IDS[n] for n in row] for row in names], dtype=np.uint8))
+
+    def load_grid(self, grid):
+        """Replace the grid with a ChunkedGrid or a dense uint8 array of Tile ids."""
+        if not isinstance(grid, ChunkedGrid):
+            grid = ChunkedGrid.from_dense(np.asarray(grid, dtype=np.uint8))
+        self.grid = grid
+        self.rows, self.cols = grid.shape
+        self.version += 1
+        self.masks.clear()
+        self._rebuild_growable()
+        self._reset()
+
+    def has_road_neighbor(self, row, col):
+        return any(self.in_bounds(row+dr, col+dc) and self.grid[row+dr, col+dc] == Tile.ROAD
+                   for dr, dc in NEIGHBORS)
+
+    def find_nearest(self, tile_type, start_x, start_y, claimed=None, accept=None):
         from collections import deque
         claimed = claimed or set()
+        target  = tile_id(tile_type)
+        grid    = self.grid
         visited = {(start_y, start_x)}
         queue = deque([(start_y, start_x)])
         while queue:
             y, x = queue.popleft()
-            if self.grid[y][x] == tile_type and (y, x) not in claimed:
+            if grid[y, x] == target and (y, x) not in claimed and (accept is None or accept((y, x))):
                 return (y, x)
-            for dy, dx in [(-1,0),(1,0),(0,-1),(0,1)]:
+            for dy, dx in NEIGHBORS:
                 ny, nx = y+dy, x+dx
-                if 0<=ny<ROWS and 0<=nx<COLS and (ny, nx) not in visited:
+                if 0<=ny<self.rows and 0<=nx<self.cols and (ny, nx) not in visited:
                     visited.add((ny, nx))
                     queue.append((ny, nx))
         return None
 
+    # ——— Zone growth ———————————————————————————————————————————————————
+    def _refresh_growable(self, row, col):
+        if self.growable is None or not self.in_bounds(row, col):
+            return
+        cell = (row, col)
+        t = self.grid[row, col]
+        for zone, cells in self.growable.items():
+            if t == zone and self.has_road_neighbor(row, col):
+                cells.add(cell)
+            else:
+                cells.discard(cell)
+
+    def _rebuild_growable(self):
+        """
+        Index the frontier after the whole grid changed. A frontier of
+        GROWTH_INDEX_LIMIT tiles or more isn't indexed (growable = None):
+        filling the sets would cost more than many ticks of grow_zones.
+        """
+        masks, frontier = [], 0
+        for r0, c0, block in self.iter_chunks():
+            h, w = block.shape
+            zoned = frontier_masks(self.grid.window(r0-1, r0+h+1, c0-1, c0+w+1))
+            if zoned is None:
+                continue
+            frontier += sum(np.count_nonzero(mask) for _, mask in zoned)
+            masks.append((r0, c0, zoned))
+        if frontier >= GROWTH_INDEX_LIMIT:
+            self.growable = None
+            return
+        self.growable = {zone: set() for zone in ZONE_BUILDINGS}
+        for r0, c0, zoned in masks:
+            for zone, mask in zoned:
+                cells = self.growable[zone]
+                for r, c in np.argwhere(mask).tolist():
+                    cells.add((r + r0, c + c0))
+
     def grow_zones(self, res_demand, ind_demand):
-        for r in range(ROWS):
-            for c in range(COLS):
-                t = self.grid[r][c]
-                if t=="zone_residential" and res_demand:
-                    if any(0<=r+dr<ROWS and 0<=c+dc<COLS and self.grid[r+dr][c+dc]=="road"
-                           for dr,dc in [(-1,0),(1,0),(0,-1),(0,1)]):
-                        if random.random()<0.01:
-                            self.grid[r][c] = "house"
-                elif t=="zone_industrial" and ind_demand:
-                    if any(0<=r+dr<ROWS and 0<=c+dc<COLS and self.grid[r+dr][c+dc]=="road"
-                           for dr,dc in [(-1,0),(1,0),(0,-1),(0,1)]):
-                        if random.random()<0.01:
-                            self.grid[r][c] = "factory"
+        """
+        Each growable zone tile converts with GROWTH_CHANCE per tick. Rather
+        than rolling per tile, draw how many convert and sample that many
+        from the frontier, so cost follows the frontier, not the map.
+        """
+        if self.growable is None:
+            return self._grow_zones_scan(res_demand, ind_demand)
+        demand = {Tile.ZONE_RESIDENTIAL: res_demand, Tile.ZONE_INDUSTRIAL: ind_demand}
+        grown = []
+        for zone, building in ZONE_BUILDINGS.items():
+            cells = self.growable[zone]
+            if not demand[zone] or not cells:
+                continue
+            k = binomial(self.rng, len(cells), GROWTH_CHANCE)
+            if k:
+                # sorted: a set's order depends on how it was filled, which
+                # differs between live play and a rebuild on load
+                grown += [(r, c, building) for r, c in self.rng.sample(sorted(cells), k)]
+        # a building never changes which zone tiles border a road, so
+        # converting after sampling both zones picks the same tiles
+        self.set_tiles(grown)
+
+    def _grow_zones_scan(self, res_demand, ind_demand):
+        """
+        grow_zones for an unindexed frontier, with the same odds, in
+        whole-chunk array ops (see grow_band), one band of chunk rows at a
+        time; with a GrowthScanPool attached the bands run on its processes.
+        Once the frontier has shrunk to half the limit it gets indexed again.
+        """
+        wanted = [int(zone) for zone, d in ((Tile.ZONE_RESIDENTIAL, res_demand),
+                                            (Tile.ZONE_INDUSTRIAL,  ind_demand)) if d]
+        if not wanted:
+            return
+        # numpy draws, seeded from the map's rng so a seeded world stays reproducible
+        seed = self.rng.getrandbits(64)
+        bands = {}
+        for cr, cc in sorted(self.grid.chunks):
+            bands.setdefault(cr, []).append(cc)
+        if self.growth_pool is not None:
+            results = self.growth_pool.grow(bands, wanted, seed)
+        else:
+            results = [grow_band(self.grid.window, self.grid.shape, self.grid.chunk,
+                                 cr, ccs, wanted, seed) for cr, ccs in bands.items()]
+        grown, frontier = [], 0
+        for band_grown, band_frontier in results:
+            grown += band_grown
+            frontier += band_frontier
+        # converted after the scan, so this tick's buildings can't enable more growth
+        self.set_tiles(grown)
+        if frontier - len(grown) < GROWTH_INDEX_LIMIT // 2:
+            self._rebuild_growable()
+
+
+def frontier_masks(tiles):
+    """
+    [(zone, mask), ...] marking the zone tiles of tiles[1:-1, 1:-1] with a
+    road beside them, i.e. the ones that may grow; tiles carries a one-tile
+    border so roads in the next chunk count. None if there are no zone
+    tiles. Indexing, the chunk scan and growth-scan workers all go through
+    here, and it reads NEIGHBORS like has_road_neighbor does per tile.
+    """
+    block = tiles[1:-1, 1:-1]
+    zoned = [(zone, block == zone) for zone in ZONE_BUILDINGS]
+    if not any(mask.any() for _, mask in zoned):
+        return None
+    road = tiles == Tile.ROAD
+    h, w = block.shape
+    near_road = np.zeros((h, w), dtype=bool)
+    for dr, dc in NEIGHBORS:
+        near_road |= road[1+dr:1+dr+h, 1+dc:1+dc+w]
+    for _, mask in zoned:
+        mask &= near_road
+    return zoned
+
+def grow_band(window, shape, chunk, cr, ccs, wanted, seed):
+    """
+    Growth rolls for the chunks ccs of chunk row cr: the frontier from
+    frontier_masks(), a uniform random block compared against
+    GROWTH_CHANCE. window(r0, r1, c0, c1) reads tiles, off-map as grass.
+    Returns ([(row, col, building), ...], frontier tiles seen). Each band
+    draws from its own generator, so the result doesn't depend on which
+    process runs it.
+    """
+    gen = np.random.default_rng((seed, cr))
+    rows, cols = shape
+    r0 = cr * chunk
+    h = min(chunk, rows - r0)
+    grown, frontier = [], 0
+    for cc in ccs:
+        c0 = cc * chunk
+        w = min(chunk, cols - c0)
+        zoned = frontier_masks(window(r0-1, r0+h+1, c0-1, c0+w+1))
+        if zoned is None:
+            continue
+        roll = gen.random((h, w)) < GROWTH_CHANCE
+        for zone, mask in zoned:
+            frontier += int(np.count_nonzero(mask))
+            if zone not in wanted:
+                continue
+            building = int(ZONE_BUILDINGS[zone])
+            grown.extend((r + r0, c + c0, building)
+                         for r, c in np.argwhere(mask & roll).tolist())
+    return grown, frontier
@@ -1,37 +1,214 @@
 # src/pathfinding.py
 
+from collections import OrderedDict
 from heapq import heappush, heappop
+from array import array
+import numpy as np
+from config import DENSE_SEARCH_CELLS, SEARCH_WINDOW_MARGIN
+from tile import tile_ids
 
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def a_star(grid, start, goal, valid_tiles):
-    open_set = []
-    heappush(open_set, (0, start))
-    came_from = {}
-    g_score = {start: 0}
+def passable_mask(grid, valid_tiles):
+    """Flat bytearray, 1 where grid[row, col] is one of valid_tiles."""
+    return bytearray(np.isin(grid, tile_ids(valid_tiles)).ravel().view(np.uint8))
 
-    while open_set:
-        _, current = heappop(open_set)
+class _Workspace:
+    """
+    Per-cell search arrays, allocated once per map size and reused.
+    A cell's g/parent are only meaningful when seen[i] == the current
+    search's stamp, so nothing has to be cleared between searches.
+    """
+    def __init__(self, size):
+        self.size   = size
+        self.g      = array('q', bytes(8 * size))
+        self.parent = array('q', bytes(8 * size))
+        self.seen   = array('I', bytes(4 * size))
+        self.closed = array('I', bytes(4 * size))
+        self.stamp  = 0
+
+    def next_stamp(self):
+        self.stamp += 1
+        if self.stamp >= 0xFFFFFFFF:      # wrapped: really clear once
+            for buf in (self.seen, self.closed):
+                for i in range(self.size):
+                    buf[i] = 0
+            self.stamp = 1
+        return self.stamp
+
+_workspaces = {}
+
+# running totals over every a_star call in this process, for profiling
+search_stats = {"searches": 0, "expanded": 0}
+
+def _workspace(size):
+    # one workspace, grown to the largest search area seen; windowed
+    # searches come in every size and can all share it
+    ws = _workspaces.get("ws")
+    if ws is None or ws.size < size:
+        ws = _workspaces["ws"] = _Workspace(size)
+    return ws
+
+def a_star(grid, start, goal, valid_tiles, passable=None):
+    """
+    Shortest 4-way path from start to goal over tiles in valid_tiles.
+    Returns [(row, col), ...] excluding start and including goal, or []
+    when unreachable. The start tile itself never has to be passable.
 
-        if current == goal:
+    Works on flat cell indices: passability is a bytearray (pass one from
+    MapManager.passable() to skip building it), g-scores and parents live
+    in a reused workspace, expanded cells go in a closed set, and ties on
+    f are broken toward the goal (smaller h), which keeps the result
+    deterministic and cuts expansions on open road grids.
+    """
+    rows, cols = grid.shape
+    n = rows * cols
+    if passable is None:
+        passable = passable_mask(grid, valid_tiles)
+
+    s = start[0] * cols + start[1]
+    t = goal[0] * cols + goal[1]
+    if s == t:
+        return []
+    gr, gc = goal
+
+    ws = _workspace(n)
+    g, parent, seen, closed = ws.g, ws.parent, ws.seen, ws.closed
+    stamp = ws.next_stamp()
+
+    # heap keys pack (f, h, cell) into one int so comparisons stay cheap
+    hspan = rows + cols
+    g[s] = 0
+    parent[s] = -1
+    seen[s] = stamp
+    h0 = abs(start[0] - gr) + abs(start[1] - gc)
+    open_set = [(h0 * hspan + h0) * n + s]
+    last_col = cols - 1
+    last_row_start = n - cols
+    expanded = 0
+    search_stats["searches"] += 1
+
+    while open_set:
+        cur = heappop(open_set) % n
+        if closed[cur] == stamp:
+            continue
+        if cur == t:
+            search_stats["expanded"] += expanded
             path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
+            while cur != s:
+                path.append(divmod(cur, cols))
+                cur = parent[cur]
             path.reverse()
-            return path  # returns a list of tuples like [(y, x), (y, x)]
-
-        for dy, dx in [(-1,0), (1,0), (0,-1), (0,1)]:
-            neighbor = (current[0] + dy, current[1] + dx)
-            if (0 <= neighbor[0] < len(grid) and
-                0 <= neighbor[1] < len(grid[0]) and
-                grid[neighbor[0]][neighbor[1]] in valid_tiles):
-
-                tentative_g = g_score[current] + 1
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f = tentative_g + heuristic(neighbor, goal)
-                    heappush(open_set, (f, neighbor))
+            return path
+        closed[cur] = stamp
+        expanded += 1
+
+        ng = g[cur] + 1
+        r, c = divmod(cur, cols)
+        # neighbours as (cell, h); h from the goal-relative offsets
+        dr, dc = r - gr, c - gc
+        nbs = []
+        if cur >= cols:            nbs.append((cur - cols, abs(dr - 1) + abs(dc)))
+        if cur < last_row_start:   nbs.append((cur + cols, abs(dr + 1) + abs(dc)))
+        if c > 0:                  nbs.append((cur - 1,    abs(dr) + abs(dc - 1)))
+        if c < last_col:           nbs.append((cur + 1,    abs(dr) + abs(dc + 1)))
+        for nb, h in nbs:
+            if not passable[nb] or closed[nb] == stamp:
+                continue
+            if seen[nb] == stamp and g[nb] <= ng:
+                continue
+            seen[nb]   = stamp
+            g[nb]      = ng
+            parent[nb] = cur
+            heappush(open_set, ((ng + h) * hspan + h) * n + nb)
+    search_stats["expanded"] += expanded
     return []
+
+
+def search(grid, start, goal, valid_tiles, passable=None):
+    """
+    a_star on a ChunkedGrid. Maps up to DENSE_SEARCH_CELLS are searched
+    whole, using passable(valid_key) for the cached whole-map mask when
+    given. Bigger maps are searched in a window around start and goal that
+    grows until the path found is provably shortest: any route leaving a
+    window padded by m tiles is at least 2*(m+1) longer than Manhattan.
+    """
+    valid_key = tile_ids(valid_tiles)
+    rows, cols = grid.shape
+    if rows * cols <= DENSE_SEARCH_CELLS:
+        mask = passable(valid_key) if passable else passable_mask(grid.to_dense(), valid_key)
+        return a_star(grid, start, goal, valid_key, passable=mask)
+
+    (sr, sc), (gr, gc) = start, goal
+    direct = abs(sr - gr) + abs(sc - gc)
+    m = SEARCH_WINDOW_MARGIN
+    while True:
+        r0, r1 = max(0, min(sr, gr) - m), min(rows, max(sr, gr) + m + 1)
+        c0, c1 = max(0, min(sc, gc) - m), min(cols, max(sc, gc) + m + 1)
+        whole = r0 == 0 and c0 == 0 and r1 == rows and c1 == cols
+        window = grid.window(r0, r1, c0, c1)
+        path = a_star(window, (sr - r0, sc - c0), (gr - r0, gc - c0), valid_key)
+        if path and (whole or len(path) <= direct + 2 * (m + 1)):
+            return [(r + r0, c + c0) for r, c in path]
+        if whole:
+            return []
+        m *= 4
+
+
+class PathCache:
+    """
+    LRU cache of a_star results keyed by (start, goal, valid tile set).
+
+    Listens to MapManager edits. Each valid tile set remembers the map
+    version of the last edit that added or removed one of its tiles; an
+    entry computed before that version is stale and gets recomputed on
+    its next lookup. Edits to tiles nobody walks on invalidate nothing.
+    """
+    def __init__(self, map_mgr, capacity=4096):
+        self.map_mgr  = map_mgr
+        self.capacity = capacity
+        self.entries  = OrderedDict()   # key -> (map version, path tuple)
+        self.changed_at = {}            # valid_key -> map version of last relevant edit
+        self.hits   = 0
+        self.misses = 0
+        self.stale  = 0
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        version = self.map_mgr.version
+        for valid_key in self.changed_at:
+            if any(old in valid_key or new in valid_key for _, _, old, new in changes):
+                self.changed_at[valid_key] = version
+
+    def on_grid_reset(self, map_mgr):
+        self.entries.clear()
+
+    # ——— Lookup ——————————————————————————————————————————————————————————
+    def get(self, start, goal, valid_tiles):
+        valid_key = tile_ids(valid_tiles)
+        key = (start, goal, valid_key)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] >= self.changed_at.get(valid_key, 0):
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return list(entry[1])    # callers consume paths in place
+            self.stale += 1
+        self.misses += 1
+
+        path = search(self.map_mgr.grid, start, goal, valid_key,
+                      passable=self.map_mgr.passable)
+        self.changed_at.setdefault(valid_key, 0)
+        self.entries[key] = (self.map_mgr.version, tuple(path))
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return path
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale,
+                "size": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,184 @@
+# src/pathqueue.py
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config      import (MOVE_IN_TILES, WALK_TILES, DRIVE_TILES,
+                         PATH_WORKERS, PATH_REQUESTS_PER_TICK)
+from pathfinding import search, passable_mask
+from flowfield   import FlowFields
+from roadgraph   import RoadGraph
+from tile        import tile_ids
+
+# travel mode -> tiles it may use; "drive" is routed on the road graph
+PATH_MODES = {"move_in": MOVE_IN_TILES, "walk": WALK_TILES, "drive": DRIVE_TILES}
+
+class PathRequests:
+    """
+    Queue of (start, goal, mode) path searches, solved in batches off the
+    simulation's critical path.
+
+    Requests for the same key share one search. Each tick, dispatch() starts
+    at most `budget` searches against a snapshot of the grid; their results
+    come back from collect() on the next tick, whether they ran in a worker
+    process or in-process (workers=0), so timing never depends on the pool.
+    Anything over the budget waits in FIFO order for a later tick. Trips
+    to or from a popular tile are walked down its flow field instead of
+    searched (see flowfield.FlowFields).
+    """
+    def __init__(self, map_mgr, paths, road_graph,
+                 workers=PATH_WORKERS, budget=PATH_REQUESTS_PER_TICK):
+        self.map_mgr    = map_mgr
+        self.paths      = paths          # in-process a_star cache
+        self.road_graph = road_graph     # in-process car routing
+        self.fields     = FlowFields(map_mgr)  # shared routes to/from popular tiles
+        self.workers    = workers
+        self.budget     = budget
+        self.pool       = None           # started on first use
+
+        self.queue     = deque()         # keys not dispatched yet
+        self.waiting   = {}              # key -> [requester, ...], queued or in flight
+        self.in_flight = []              # (keys, paths, [(slots, future), ...]) per dispatch
+        self.changed_at = {mode: 0 for mode in PATH_MODES}  # map version of last relevant edit
+
+        self.submitted = 0
+        self.deduped   = 0
+        self.solved    = 0
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        version = self.map_mgr.version
+        for mode, tiles in PATH_MODES.items():
+            valid = tile_ids(tiles)
+            if any(old in valid or new in valid for _, _, old, new in changes):
+                self.changed_at[mode] = version
+
+    def on_grid_reset(self, map_mgr):
+        for mode in self.changed_at:
+            self.changed_at[mode] = map_mgr.version
+
+    # ——— Requests ——————————————————————————————————————————————————————
+    def submit(self, start, goal, mode, requester):
+        key = (start, goal, mode)
+        self.submitted += 1
+        waiters = self.waiting.get(key)
+        if waiters is not None:
+            waiters.append(requester)
+            self.deduped += 1
+            return
+        self.waiting[key] = [requester]
+        self.queue.append(key)
+
+    def __len__(self):
+        return len(self.waiting)
+
+    def dispatch(self):
+        """Start up to `budget` queued searches on a snapshot of the map."""
+        n = min(self.budget, len(self.queue))
+        if not n:
+            return
+        keys = [self.queue.popleft() for _ in range(n)]
+        if self.workers <= 0:
+            self.in_flight.append((keys, [self._solve_here(k) for k in keys], []))
+            return
+
+        # trips a flow field covers are a walk down it: no need for a worker.
+        # Results keep their key's slot, so delivery order never depends
+        # on which trips went to the pool.
+        paths = [self._walk_field(key) for key in keys]
+        rest = [i for i, path in enumerate(paths) if path is None]
+        batches = []
+        if rest:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            grid = self.map_mgr.grid.copy()      # only the built-on chunks
+            versions = dict(self.changed_at)
+            size = -(-len(rest) // self.workers)
+            for i in range(0, len(rest), size):
+                slots = rest[i:i+size]
+                batches.append((slots, self.pool.submit(solve_batch, grid, versions,
+                                                        [keys[j] for j in slots])))
+        self.in_flight.append((keys, paths, batches))
+
+    def _solve_here(self, key):
+        start, goal, mode = key
+        if mode == "drive":
+            return self.road_graph.route(start, goal)
+        path = self._walk_field(key)
+        if path is None:
+            path = self.paths.get(start, goal, PATH_MODES[mode])
+        return path
+
+    def _walk_field(self, key):
+        start, goal, mode = key
+        if mode == "drive":
+            return None          # the road graph is already cheaper
+        return self.fields.route(start, goal, PATH_MODES[mode])
+
+    def collect(self):
+        """[(key, path, requesters), ...] for everything dispatched last tick."""
+        done = []
+        for keys, paths, batches in self.in_flight:
+            for slots, future in batches:
+                for i, path in zip(slots, future.result()):
+                    paths[i] = path
+            for key, path in zip(keys, paths):
+                done.append((key, path, self.waiting.pop(key)))
+        self.in_flight.clear()
+        self.solved += len(done)
+        return done
+
+    def clear(self):
+        """Forget every queued and in-flight request, e.g. when a save is loaded."""
+        for _, _, batches in self.in_flight:
+            for _, future in batches:
+                future.cancel()
+        self.queue.clear()
+        self.waiting.clear()
+        self.in_flight.clear()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def stats(self):
+        return {"submitted": self.submitted, "deduped": self.deduped,
+                "solved": self.solved, "backlog": len(self.queue),
+                "flow_fields": self.fields.stats()}
+
+
+# ——— Worker side ——————————————————————————————————————————————————————
+class _Snapshot:
+    """Just enough of MapManager to build a RoadGraph from a copied ChunkedGrid."""
+    def __init__(self, grid):
+        self.grid = grid
+        self.rows, self.cols = grid.shape
+
+    def add_listener(self, listener):
+        listener.on_grid_reset(self)
+
+# per-process caches, reused while the relevant tiles haven't changed
+_masks = {}      # mode -> (version, passable bytearray)
+_roads = None    # (version, RoadGraph)
+
+def solve_batch(grid, versions, keys):
+    """Solve [(start, goal, mode), ...] on grid; runs in a worker process."""
+    global _roads
+    out = []
+    for start, goal, mode in keys:
+        version = versions[mode]
+        if mode == "drive":
+            if _roads is None or _roads[0] != version:
+                _roads = (version, RoadGraph(_Snapshot(grid)))
+            out.append(_roads[1].route(start, goal))
+            continue
+        out.append(search(grid, start, goal, PATH_MODES[mode],
+                          passable=lambda key: _mask(grid, mode, version, key)))
+    return out
+
+def _mask(grid, mode, version, key):
+    cached = _masks.get(mode)
+    if cached is None or cached[0] != version:
+        cached = _masks[mode] = (version, passable_mask(grid.to_dense(), key))
+    return cached[1]
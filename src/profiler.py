@@ -0,0 +1,106 @@
+# src/profiler.py
+
+import csv, json, time
+from collections import deque
+import numpy as np
+
+class _Section:
+    __slots__ = ("prof", "name", "t0")
+
+    def __init__(self, prof, name):
+        self.prof = prof
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.prof.record(self.name, (time.perf_counter() - self.t0) * 1000)
+
+class _Off:
+    def __enter__(self): pass
+    def __exit__(self, *exc): pass
+
+_OFF = _Off()
+
+class Profiler:
+    """
+    Named timings (ms) and counters, kept over a rolling window of samples
+    for percentiles and logged as (frame, name, value) rows for export.
+
+        with prof.section("economy"):
+            ...
+        prof.count("nodes expanded", n)
+        prof.next_frame()
+
+    A disabled profiler hands out a shared no-op section, so the hooks can
+    stay in hot code.
+    """
+    def __init__(self, enabled=True, window=600, trace_limit=200_000):
+        self.enabled = enabled
+        self.window  = window
+        self.samples = {}                          # name -> deque of recent values
+        self.kinds   = {}                          # name -> "ms" or "count"
+        self.trace   = deque(maxlen=trace_limit)   # (frame, name, value)
+        self.frame   = 0
+
+    # ——— Recording ——————————————————————————————————————————————————————
+    def section(self, name):
+        return _Section(self, name) if self.enabled else _OFF
+
+    def record(self, name, value, kind="ms"):
+        if not self.enabled:
+            return
+        q = self.samples.get(name)
+        if q is None:
+            q = self.samples[name] = deque(maxlen=self.window)
+            self.kinds[name] = kind
+        q.append(value)
+        self.trace.append((self.frame, name, value))
+
+    def count(self, name, n):
+        self.record(name, n, kind="count")
+
+    def next_frame(self):
+        self.frame += 1
+
+    # ——— Reporting ——————————————————————————————————————————————————————
+    def summary(self):
+        """{name: {unit, n, mean, p50, p95, p99, max}} over the rolling window."""
+        out = {}
+        for name, q in self.samples.items():
+            if not q:
+                continue
+            a = np.fromiter(q, dtype=np.float64, count=len(q))
+            p50, p95, p99 = np.percentile(a, (50, 95, 99)).tolist()
+            out[name] = {"unit": self.kinds[name], "n": len(a), "mean": float(a.mean()),
+                         "p50": p50, "p95": p95, "p99": p99, "max": float(a.max())}
+        return out
+
+    def export(self, fn):
+        """Trace to fn: CSV rows (frame,name,unit,value), or JSON with the summary too."""
+        if fn.endswith(".csv"):
+            with open(fn, "w", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(("frame", "name", "unit", "value"))
+                for frame, name, value in self.trace:
+                    w.writerow((frame, name, self.kinds[name], value))
+        else:
+            with open(fn, "w") as f:
+                json.dump({"summary": self.summary(),
+                           "trace": [{"frame": fr, "name": n, "value": v}
+                                     for fr, n, v in self.trace]}, f)
+
+    def draw(self, screen, font, x=10, y=10):
+        """On-screen table of the rolling percentiles."""
+        import pygame
+        rows = [f"{'section':18s} {'p50':>7s} {'p95':>7s} {'p99':>7s}"]
+        for name, s in sorted(self.summary().items()):
+            unit = "ms" if s["unit"] == "ms" else ""
+            rows.append(f"{name:18s} {s['p50']:7.2f} {s['p95']:7.2f} {s['p99']:7.2f} {unit}")
+        h = font.get_linesize()
+        panel = pygame.Surface((360, h * len(rows) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        screen.blit(panel, (x - 4, y - 4))
+        for i, row in enumerate(rows):
+            screen.blit(font.render(row, True, (255, 255, 255)), (x, y + i * h))
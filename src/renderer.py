@@ -0,0 +1,143 @@
+# src/renderer.py
+
+import math
+import numpy as np
+import pygame
+from config import TILE_SIZE, RENDER_CHUNK_TILES, AGENT_LOD_ZOOM
+from tile   import TILE_COLORS
+
+# Tile id -> RGB lookup table for turning a block of ids into pixels at once
+PALETTE = np.array(TILE_COLORS, dtype=np.uint8)
+
+class TileRenderer:
+    """
+    Draws the map from cached chunk surfaces instead of one rect per tile.
+
+    Each RENDER_CHUNK_TILES x RENDER_CHUNK_TILES block is rasterised once at
+    one pixel per tile, scaled to the current zoom, and reused until a tile
+    inside it changes (MapManager event) or the zoom changes. Only chunks
+    overlapping the viewport are scaled and blitted.
+    """
+    def __init__(self, map_mgr, tile_size=TILE_SIZE, chunk_tiles=RENDER_CHUNK_TILES):
+        self.map_mgr     = map_mgr
+        self.tile_size   = tile_size
+        self.chunk_tiles = chunk_tiles
+        self.base   = {}     # (chunk_row, chunk_col) -> 1px-per-tile Surface
+        self.scaled = {}     # (chunk_row, chunk_col) -> Surface at self.zoom
+        self.zoom   = None
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        ct = self.chunk_tiles
+        for r, c, _, _ in changes:
+            key = (r // ct, c // ct)
+            self.base.pop(key, None)
+            self.scaled.pop(key, None)
+
+    def on_grid_reset(self, map_mgr):
+        self.base.clear()
+        self.scaled.clear()
+
+    # ——— Chunk surfaces ——————————————————————————————————————————————————
+    def _base_surface(self, key):
+        surf = self.base.get(key)
+        if surf is None:
+            ct = self.chunk_tiles
+            r0, c0 = key[0] * ct, key[1] * ct
+            m    = self.map_mgr
+            ids  = m.grid.window(r0, min(r0+ct, m.rows), c0, min(c0+ct, m.cols))
+            # surfarray is indexed [x][y], the grid [row][col]
+            surf = pygame.surfarray.make_surface(PALETTE[ids].swapaxes(0, 1))
+            self.base[key] = surf
+        return surf
+
+    def _scaled_surface(self, key):
+        surf = self.scaled.get(key)
+        if surf is None:
+            base = self._base_surface(key)
+            px   = self.tile_size * self.zoom
+            # ceil so neighbouring chunks overlap by <1px instead of leaving seams
+            size = (math.ceil(base.get_width() * px), math.ceil(base.get_height() * px))
+            surf = pygame.transform.scale(base, size)
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert()
+            self.scaled[key] = surf
+        return surf
+
+    # ——— Drawing ————————————————————————————————————————————————————————
+    def visible_chunks(self, camera, screen_w, screen_h):
+        chunk_px = self.chunk_tiles * self.tile_size
+        max_r = (self.map_mgr.rows - 1) // self.chunk_tiles
+        max_c = (self.map_mgr.cols - 1) // self.chunk_tiles
+        c0 = max(0,     int(camera.x // chunk_px))
+        r0 = max(0,     int(camera.y // chunk_px))
+        c1 = min(max_c, int((camera.x + screen_w / camera.zoom) // chunk_px))
+        r1 = min(max_r, int((camera.y + screen_h / camera.zoom) // chunk_px))
+        return [(r, c) for r in range(r0, r1+1) for c in range(c0, c1+1)]
+
+    def draw(self, screen, camera):
+        if camera.zoom != self.zoom:
+            self.zoom = camera.zoom
+            self.scaled.clear()
+
+        chunk_px = self.chunk_tiles * self.tile_size
+        visible  = self.visible_chunks(camera, *screen.get_size())
+        for key in visible:
+            sx, sy = camera.apply((key[1] * chunk_px, key[0] * chunk_px))
+            screen.blit(self._scaled_surface(key), (round(sx), round(sy)))
+
+        # scaled copies are cheap to rebuild; don't hoard ones panned away from
+        if len(self.scaled) > 2 * len(visible):
+            self.scaled = {k: self.scaled[k] for k in visible}
+
+
+class AgentRenderer:
+    """
+    Draws only the Sims and vehicles in the viewport: Sims come from the
+    world's AgentGrid buckets under the view, vehicles are culled with one
+    array comparison. Zoomed out below AGENT_LOD_ZOOM, each bucket with
+    anyone in it is a single dot sized by its headcount instead, so draw
+    cost follows what is on screen, not the population.
+    """
+    def __init__(self, world, tile_size=TILE_SIZE, lod_zoom=AGENT_LOD_ZOOM):
+        self.world     = world
+        self.tile_size = tile_size
+        self.lod_zoom  = lod_zoom
+        self.drawn     = 0       # agents (or dots) drawn last frame
+
+    def view(self, camera, screen_w, screen_h):
+        """Visible tiles as (r0, r1, c0, c1), inclusive, padded one tile for agent radii."""
+        ts = self.tile_size
+        c0 = int(camera.x // ts) - 1
+        r0 = int(camera.y // ts) - 1
+        c1 = int((camera.x + screen_w / camera.zoom) // ts) + 1
+        r1 = int((camera.y + screen_h / camera.zoom) // ts) + 1
+        return r0, r1, c0, c1
+
+    def draw(self, screen, camera):
+        r0, r1, c0, c1 = self.view(camera, *screen.get_size())
+        ts = self.tile_size
+        pixels = (c0 * ts, r0 * ts, (c1 + 1) * ts, (r1 + 1) * ts)
+        world = self.world
+        if camera.zoom < self.lod_zoom:
+            self.drawn = self._draw_density(screen, camera, (r0, r1, c0, c1), pixels)
+            return
+        n = 0
+        for sim in world.sim_grid.query(r0, r1, c0, c1):
+            sim.draw(screen, camera)
+            n += 1
+        self.drawn = n + world.vehicles.draw(screen, camera, view=pixels)
+
+    def _draw_density(self, screen, camera, tiles, pixels):
+        grid = self.world.sim_grid
+        cell_px = grid.cell * self.tile_size
+        counts = self.world.vehicles.density(cell_px, view=pixels)
+        for br, bc, sims in grid.cells(*tiles):
+            counts[(br, bc)] = counts.get((br, bc), 0) + len(sims)
+        most = cell_px * camera.zoom / 2
+        for (br, bc), n in counts.items():
+            sx, sy = camera.apply(((bc + 0.5) * cell_px, (br + 0.5) * cell_px))
+            radius = min(most, 2 + math.sqrt(n))
+            pygame.draw.circle(screen, (0, 0, 255), (round(sx), round(sy)), round(radius))
+        return len(counts)
@@ -0,0 +1,290 @@
+# src/roadgraph.py
+
+from heapq import heappush, heappop
+import numpy as np
+from tile  import Tile
+from utils import neighbor_pairs
+from map   import NEIGHBORS
+
+# a batch editing more than 1/REBUILD_RATIO as many tiles as there are
+# roads is cheaper to absorb by rebuilding the graph than by re-tracing
+# around each edit
+REBUILD_RATIO = 16
+
+class RoadGraph:
+    """
+    Road network contracted to a graph for vehicle routing.
+
+    Nodes are road tiles that are not plain pass-through tiles: dead ends,
+    junctions (3-4 road neighbours) and isolated tiles. Every maximal run of
+    2-neighbour road tiles between two nodes is one edge that remembers its
+    interior tiles, so a long straight road costs one hop instead of one
+    search step per tile. Kept up to date from MapManager road edits by
+    re-tracing only the edges around the edited tile. A batch edit touching
+    more than 1/REBUILD_RATIO of the road tiles marks the graph stale
+    instead, and the next route rebuilds it.
+    """
+    def __init__(self, map_mgr):
+        self.map_mgr = map_mgr
+        self.roads   = set()     # every road tile
+        self.nodes   = set()
+        self.forced  = set()     # nodes picked to break up junction-less loops
+        self.edges   = {}        # eid -> (a, b, interior tiles ordered a -> b)
+        self.adj     = {}        # node -> {first tile out of node: eid}
+        self.tile_edge = {}      # interior tile -> eid
+        self.next_eid  = 0
+        self.last_expanded = 0   # nodes popped by the most recent route()
+        self.routes = 0          # running totals, for profiling
+        self.total_expanded = 0
+        self.stale = False       # set when edits were left for refresh()
+        map_mgr.add_listener(self)
+
+    # ——— MapManager listener ———————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        if self.stale:
+            return
+        if len(changes) * REBUILD_RATIO > len(self.roads) + len(changes):
+            self.stale = True
+            return
+        for r, c, old, new in changes:
+            if old == Tile.ROAD or new == Tile.ROAD:
+                self._update((r, c), new == Tile.ROAD)
+
+    def on_grid_reset(self, map_mgr):
+        self.stale = True
+
+    def refresh(self):
+        """Rebuild the graph now if edits left it stale."""
+        if not self.stale:
+            return
+        self.stale = False
+        tiles = self.map_mgr.grid.positions((Tile.ROAD,))
+        self.roads = set(tiles)
+        self.nodes.clear(); self.forced.clear(); self.edges.clear()
+        self.adj.clear();   self.tile_edge.clear()
+        if tiles:
+            # nodes are the road tiles without exactly two road neighbours
+            cols = self.map_mgr.cols
+            rc = np.array(tiles, dtype=np.int64)
+            flat = np.sort(rc[:, 0] * cols + rc[:, 1])
+            degree = np.zeros(len(flat), dtype=np.int64)
+            for side in neighbor_pairs(flat, cols):
+                degree += np.bincount(side, minlength=len(flat))
+            rows, cs = np.divmod(flat[degree != 2], cols)
+            for t in zip(rows.tolist(), cs.tolist()):
+                self._add_node(t)
+        for t in list(self.nodes):
+            self._trace_from(t)
+        self._cover_loops(self.roads)
+
+    # ——— Structure ——————————————————————————————————————————————————————
+    def _road_neighbors(self, t):
+        roads = self.roads
+        r, c = t
+        return [(r+dr, c+dc) for dr, dc in NEIGHBORS if (r+dr, c+dc) in roads]
+
+    def _wants_node(self, t):
+        return t in self.forced or len(self._road_neighbors(t)) != 2
+
+    def _add_node(self, t):
+        self.nodes.add(t)
+        self.adj.setdefault(t, {})
+
+    def _drop_node(self, t):
+        self.nodes.discard(t)
+        self.forced.discard(t)
+        self.adj.pop(t, None)
+
+    def _remove_edge(self, eid, seeds):
+        a, b, tiles = self.edges.pop(eid)
+        for t in tiles:
+            del self.tile_edge[t]
+        for node, first in ((a, tiles[0] if tiles else b), (b, tiles[-1] if tiles else a)):
+            out = self.adj.get(node)
+            if out is not None and out.get(first) == eid:
+                del out[first]
+            seeds.add(node)
+        return tiles
+
+    def _trace_from(self, a):
+        """Create the edges leaving node a that don't exist yet."""
+        for s in self._road_neighbors(a):
+            if s in self.adj[a]:
+                continue
+            tiles, prev, cur = [], a, s
+            nodes, roads = self.nodes, self.roads
+            while cur not in nodes:
+                tiles.append(cur)
+                r, c = cur
+                for n in ((r-1, c), (r+1, c), (r, c-1), (r, c+1)):
+                    if n != prev and n in roads:
+                        break
+                prev, cur = cur, n
+            b = cur
+            eid = self.next_eid
+            self.next_eid += 1
+            self.edges[eid] = (a, b, tiles)
+            for t in tiles:
+                self.tile_edge[t] = eid
+            self.adj[a][s] = eid
+            self.adj[b][tiles[-1] if tiles else a] = eid
+
+    def _cover_loops(self, tiles):
+        """Road tiles left outside every edge sit on a loop with no junction."""
+        for t in tiles:
+            if t in self.roads and t not in self.nodes and t not in self.tile_edge:
+                self.forced.add(t)
+                self._add_node(t)
+                self._trace_from(t)
+
+    def _update(self, t, is_road):
+        r, c = t
+        around = [t] + [(r+dr, c+dc) for dr, dc in NEIGHBORS]
+
+        # 1) tear down every edge touching the edited tile or its neighbours
+        seeds, loose = set(), []
+        for x in around:
+            eid = self.tile_edge.get(x)
+            if eid is not None:
+                loose += self._remove_edge(eid, seeds)
+            if x in self.nodes:
+                for eid in list(self.adj[x].values()):
+                    if eid in self.edges:
+                        loose += self._remove_edge(eid, seeds)
+
+        # 2) apply the edit and refresh node status around it
+        if is_road:
+            self.roads.add(t)
+        else:
+            self.roads.discard(t)
+            self._drop_node(t)
+        for x in around:
+            if x not in self.roads:
+                continue
+            if self._wants_node(x):
+                self._add_node(x)
+            elif x in self.nodes:
+                self._drop_node(x)
+                seeds.discard(x)
+
+        # 3) re-trace from every node that lost an edge
+        for x in seeds | set(around):
+            if x in self.nodes:
+                self._trace_from(x)
+        self._cover_loops(loose + around)
+
+    # ——— Routing ————————————————————————————————————————————————————————
+    def _entries(self, t):
+        """Road tiles a trip at t can use: t itself, or its road neighbours."""
+        if t in self.roads:
+            return [(t, [])]
+        return [(n, [n]) for n in self._road_neighbors(t)]
+
+    def _to_nodes(self, t):
+        """(node, tiles after t up to and including node) for road tile t."""
+        if t in self.nodes:
+            return [(t, [])]
+        a, b, tiles = self.edges[self.tile_edge[t]]
+        i = tiles.index(t)
+        return [(a, tiles[i-1::-1] + [a] if i else [a]),
+                (b, tiles[i+1:] + [b])]
+
+    def route(self, start, goal):
+        """
+        Per-tile path [(row, col), ...] from start to goal (start excluded,
+        goal included) along roads, or [] if there is none. start and goal
+        may be road tiles or buildings next to a road.
+        """
+        self.refresh()
+        self.last_expanded = 0
+        self.routes += 1
+        if start == goal:
+            return []
+        starts = self._entries(start)
+        goals  = [(g, [] if g == goal else [goal]) for g, _ in self._entries(goal)]
+        if not starts or not goals:
+            return []
+
+        best, best_path = None, None
+
+        # trips that never leave one edge (or share an entry tile)
+        for s, head in starts:
+            for g, tail in goals:
+                direct = self._along_edge(s, g)
+                if direct is not None:
+                    path = head + direct + tail
+                    if best is None or len(path) < best:
+                        best, best_path = len(path), path
+
+        # node -> (cost from start to node, tiles from node to goal)
+        exits = {}
+        for g, tail in goals:
+            for node, tiles in self._to_nodes(g):
+                back = tiles[-2::-1] + [g] if tiles else []
+                if node not in exits or len(back) + len(tail) < len(exits[node]):
+                    exits[node] = back + tail
+
+        gr, gc = goal
+        dist, parent, heap, n = {}, {}, [], 0
+        for s, head in starts:
+            for node, tiles in self._to_nodes(s):
+                lead = head + tiles
+                if node not in dist or len(lead) < dist[node]:
+                    dist[node] = len(lead)
+                    parent[node] = (None, lead)
+                    heappush(heap, (len(lead) + abs(node[0]-gr) + abs(node[1]-gc), n, node))
+                    n += 1
+
+        done, end = set(), None
+        while heap:
+            f, _, u = heappop(heap)
+            if u in done:
+                continue
+            if best is not None and f >= best:
+                break
+            done.add(u)
+            self.last_expanded += 1
+            if u in exits:
+                total = dist[u] + len(exits[u])
+                if best is None or total < best:
+                    best, best_path, end = total, None, u
+            for first, eid in self.adj[u].items():
+                a, b, tiles = self.edges[eid]
+                if a == b:
+                    continue
+                v = b if u == a else a
+                nd = dist[u] + len(tiles) + 1
+                if v not in dist or nd < dist[v]:
+                    dist[v] = nd
+                    parent[v] = (u, eid)
+                    heappush(heap, (nd + abs(v[0]-gr) + abs(v[1]-gc), n, v))
+                    n += 1
+        self.total_expanded += self.last_expanded
+
+        if best_path is not None or end is None:
+            return best_path or []
+
+        # expand node chain back into tiles
+        legs, v = [], end
+        while True:
+            u, via = parent[v]
+            if u is None:
+                legs.append(via)
+                break
+            a, b, tiles = self.edges[via]
+            legs.append((tiles if u == a else tiles[::-1]) + [v])
+            v = u
+        path = [t for leg in reversed(legs) for t in leg]
+        return path + exits[end]
+
+    def _along_edge(self, s, g):
+        """Tiles from road tile s to road tile g (excl. s) if both lie on one edge."""
+        if s == g:
+            return []
+        for eid in {self.tile_edge.get(s), self.tile_edge.get(g)} - {None}:
+            a, b, tiles = self.edges[eid]
+            line = [a] + tiles + [b]
+            if s in line and g in line:
+                i, j = line.index(s), line.index(g)
+                return line[i+1:j+1] if i < j else line[j:i][::-1]
+        return None
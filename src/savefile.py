@@ -0,0 +1,287 @@
+# src/savefile.py
+
+"""
+Binary save format, version 1 (all integers little-endian):
+
+  header   magic "TTSV", format version, flags, map rows/cols, chunk size,
+           chunk count and the offset/length of each section below
+  index    int32 (chunk_row, chunk_col) per stored chunk
+  tiles    chunk x chunk uint8 Tile ids per stored chunk, back to back;
+           raw so the layer can be memory-mapped, or zlib'd (FLAG_TILES_ZLIB)
+  records  zlib'd: u32 JSON length, JSON (world scalars, RNG state, path
+           requests, array directory), then the packed arrays it lists
+           (Sims, their paths, vehicles, claims, riders, wake-up order)
+
+Grass-only chunks are never written, same as they're never stored.
+"""
+
+import io, json, os, struct, threading, zlib
+import numpy as np
+from chunks  import ChunkedGrid
+from sim     import Sim, NO_PATH
+from vehicle import VehicleStore
+from scheduler import TickScheduler
+
+MAGIC          = b"TTSV"
+FORMAT_VERSION = 1
+FLAG_TILES_ZLIB = 1
+
+_HEADER = struct.Struct("<4sHHIIII6Q")
+
+SIM_RECORD = np.dtype([
+    ("x", "<i4"), ("y", "<i4"), ("state", "u1"), ("resume", "i1"),
+    ("home", "<i4", 2), ("job", "<i4", 2),
+    ("state_timer", "<i8"), ("vehicle", "<i8"),
+    ("path_i", "<i4"), ("path_start", "<i8"), ("path_len", "<i4"),
+])
+
+class SaveError(Exception):
+    pass
+
+# ——— Writing ————————————————————————————————————————————————————————————
+def _pack_sims(sims):
+    recs  = np.zeros(len(sims), dtype=SIM_RECORD)
+    paths = []
+    at = 0
+    for i, s in enumerate(sims):
+        rec = recs[i]
+        rec["x"], rec["y"], rec["state"] = s.tile_x, s.tile_y, s.state
+        rec["resume"] = -1 if s.resume is None else s.resume
+        rec["home"] = s.home if s.home else (-1, -1)
+        rec["job"]  = s.job  if s.job  else (-1, -1)
+        rec["state_timer"] = s.state_timer
+        rec["vehicle"] = -1 if s.vehicle is None else s.vehicle
+        rec["path_i"], rec["path_start"], rec["path_len"] = s.path_i, at, len(s.path)
+        paths.extend(s.path)
+        at += len(s.path)
+    return recs, np.array(paths, dtype=np.int32).reshape(-1, 2)
+
+def snapshot(world, extra=None):
+    """
+    Everything a save needs, copied out of world. Cheap next to the write,
+    and after it returns the world can keep ticking while the copy is
+    written out. extra is merged into the saved metadata.
+    """
+    index = {id(s): i for i, s in enumerate(world.sims)}
+    sims, sim_paths = _pack_sims(world.sims)
+    arrays = {
+        "sims": sims, "sim_paths": sim_paths,
+        "claimed_homes": np.array(sorted(world.claimed_homes), dtype=np.int32).reshape(-1, 2),
+        "claimed_jobs":  np.array(sorted(world.claimed_jobs),  dtype=np.int32).reshape(-1, 2),
+        "riders": np.array([(vid, index[id(s)]) for vid, s in world.riders.items()],
+                           dtype=np.int64).reshape(-1, 2),
+        "wakeups": np.array([(tick, index[id(s)]) for tick, s in world.schedule.entries()],
+                            dtype=np.int64).reshape(-1, 2),
+    }
+    for name, arr in world.vehicles.export().items():
+        arrays["vehicle_" + name] = arr
+
+    version, state, gauss = world.rng.getstate()
+    meta = {
+        "seed": world.seed, "tick": world.tick, "money": world.money,
+        "last_income_tick": world.last_income_tick,
+        "income_interval": world.income_interval, "spawn_interval": world.spawn_interval,
+        "econ": {"income": world.econ.income, "tax_rate": world.econ.tax_rate,
+                 "happiness": world.econ.happiness},
+        "rng": [version, list(state), gauss],
+        # waiting Sims are re-queued on load
+        "path_requests": [[list(start), list(goal), mode, [index[id(s)] for s in sims_]]
+                          for (start, goal, mode), sims_ in world.path_requests.waiting.items()],
+    }
+    meta.update(extra or {})
+    grid = world.map_mgr.grid
+    keys = sorted(grid.chunks)
+    tiles = [np.array(grid.chunks[k]) for k in keys]     # copies: the map keeps changing
+    return {"rows": grid.rows, "cols": grid.cols, "chunk": grid.chunk,
+            "keys": keys, "tiles": tiles, "meta": meta, "arrays": arrays}
+
+def _records_blob(meta, arrays):
+    directory, blob, at = {}, io.BytesIO(), 0
+    for name, arr in arrays.items():
+        raw = np.ascontiguousarray(arr).tobytes()
+        directory[name] = [arr.dtype.descr if arr.dtype.names else arr.dtype.str,
+                           list(arr.shape), at, len(raw)]
+        blob.write(raw)
+        at += len(raw)
+    head = json.dumps(dict(meta, arrays=directory)).encode()
+    return zlib.compress(struct.pack("<I", len(head)) + head + blob.getvalue(), 6)
+
+def write(fn, snap, compress_tiles=False):
+    """Write a snapshot() to fn, via a temp file so a crash never leaves half a save."""
+    index = np.array(snap["keys"], dtype=np.int32).reshape(-1, 2).tobytes()
+    tiles = b"".join(t.tobytes() for t in snap["tiles"])
+    flags = 0
+    if compress_tiles:
+        tiles = zlib.compress(tiles, 6)
+        flags |= FLAG_TILES_ZLIB
+    records = _records_blob(snap["meta"], snap["arrays"])
+
+    index_off   = _HEADER.size
+    tiles_off   = index_off + len(index)
+    records_off = tiles_off + len(tiles)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, snap["rows"], snap["cols"],
+                          snap["chunk"], len(snap["keys"]),
+                          index_off, tiles_off, len(tiles),
+                          records_off, len(records), 0)
+    tmp = fn + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(header); f.write(index); f.write(tiles); f.write(records)
+    os.replace(tmp, fn)
+
+def release(world, fn):
+    """
+    Swap map chunks memory-mapped from fn (by a load) for in-memory copies,
+    so fn can be replaced: Windows refuses to replace a mapped file.
+    """
+    path = os.path.normcase(os.path.abspath(fn))
+    chunks = world.map_mgr.grid.chunks
+    for key, block in chunks.items():
+        if isinstance(block, np.memmap) and \
+           os.path.normcase(os.path.abspath(block.filename)) == path:
+            chunks[key] = np.array(block)
+
+def _write_logged(fn, snap, compress_tiles):
+    # on a thread nobody would see the exception
+    try:
+        write(fn, snap, compress_tiles)
+    except OSError as e:
+        print(f"🚨 Saving {fn} failed: {e}")
+
+def save(world, fn, background=False, compress_tiles=False, extra=None):
+    """
+    Save world to fn. With background=True only the snapshot happens now;
+    compressing and writing run on a thread, which is returned.
+    """
+    release(world, fn)
+    snap = snapshot(world, extra)
+    if not background:
+        write(fn, snap, compress_tiles)
+        return None
+    t = threading.Thread(target=_write_logged, args=(fn, snap, compress_tiles), daemon=True)
+    t.start()
+    return t
+
+# ——— Reading ————————————————————————————————————————————————————————————
+def read_header(fn):
+    with open(fn, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise SaveError(f"{fn}: truncated header")
+    (magic, version, flags, rows, cols, chunk, n_chunks,
+     index_off, tiles_off, tiles_len, records_off, records_len, _) = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise SaveError(f"{fn}: not a Tiletopia save")
+    if version > FORMAT_VERSION:
+        raise SaveError(f"{fn}: save format v{version} is newer than this build (v{FORMAT_VERSION})")
+    return {"version": version, "flags": flags, "rows": rows, "cols": cols,
+            "chunk": chunk, "n_chunks": n_chunks, "index_off": index_off,
+            "tiles_off": tiles_off, "tiles_len": tiles_len,
+            "records_off": records_off, "records_len": records_len}
+
+def read_tiles(fn, header=None, mmap=True):
+    """
+    The tile layer as a ChunkedGrid. Uncompressed layers are memory-mapped
+    copy-on-write: chunks are paged in when touched, and edits never reach
+    the file.
+    """
+    h = header or read_header(fn)
+    C, n = h["chunk"], h["n_chunks"]
+    grid = ChunkedGrid(h["rows"], h["cols"], chunk=C)
+    if not n:
+        return grid
+    with open(fn, "rb") as f:
+        f.seek(h["index_off"])
+        keys = np.frombuffer(f.read(8 * n), dtype=np.int32).reshape(n, 2).tolist()
+        if h["flags"] & FLAG_TILES_ZLIB:
+            f.seek(h["tiles_off"])
+            raw = zlib.decompress(f.read(h["tiles_len"]))
+            blocks = np.frombuffer(raw, dtype=np.uint8).reshape(n, C, C).copy()
+        elif mmap:
+            blocks = np.memmap(fn, dtype=np.uint8, mode="c", offset=h["tiles_off"], shape=(n, C, C))
+        else:
+            f.seek(h["tiles_off"])
+            blocks = np.frombuffer(f.read(h["tiles_len"]), dtype=np.uint8).reshape(n, C, C).copy()
+    for (cr, cc), block in zip(keys, blocks):
+        grid.chunks[(cr, cc)] = block
+    return grid
+
+def read_records(fn, header=None):
+    h = header or read_header(fn)
+    with open(fn, "rb") as f:
+        f.seek(h["records_off"])
+        raw = zlib.decompress(f.read(h["records_len"]))
+    n = struct.unpack_from("<I", raw)[0]
+    meta = json.loads(raw[4:4+n])
+    blob = memoryview(raw)[4+n:]
+    arrays = {}
+    for name, (dtype, shape, at, size) in meta.pop("arrays").items():
+        dt = np.dtype([tuple(f) for f in dtype]) if isinstance(dtype, list) else np.dtype(dtype)
+        arrays[name] = np.frombuffer(blob[at:at+size], dtype=dt).reshape(shape).copy()
+    return meta, arrays
+
+def _tile(pair):
+    r, c = int(pair[0]), int(pair[1])
+    return None if r < 0 else (r, c)
+
+def load(world, fn, mmap=True):
+    """Replace world's map, agents and economy with the save in fn; returns its metadata."""
+    h = read_header(fn)
+    # decode everything before touching world, so a bad file changes nothing
+    try:
+        grid = read_tiles(fn, h, mmap=mmap)
+        meta, arrays = read_records(fn, h)
+    except (zlib.error, struct.error, ValueError) as e:
+        raise SaveError(f"{fn}: truncated or corrupt save ({e})") from e
+
+    world.tick             = meta["tick"]
+    world.money            = meta["money"]
+    world.last_income_tick = meta["last_income_tick"]
+    world.income_interval  = meta["income_interval"]
+    world.spawn_interval   = meta["spawn_interval"]
+    world.seed             = meta["seed"]
+    econ = meta["econ"]
+    world.econ.income, world.econ.tax_rate, world.econ.happiness = \
+        econ["income"], econ["tax_rate"], econ["happiness"]
+    version, state, gauss = meta["rng"]
+    world.rng.setstate((version, tuple(state), gauss))
+
+    # claims first: the free-building indexes rebuild from them on reset
+    world.claimed_homes = set(map(tuple, arrays["claimed_homes"].tolist()))
+    world.claimed_jobs  = set(map(tuple, arrays["claimed_jobs"].tolist()))
+    world.path_requests.clear()
+    world.map_mgr.load_grid(grid)
+
+    sims = []
+    paths = [tuple(p) for p in arrays["sim_paths"].tolist()]
+    for rec in arrays["sims"]:
+        s = Sim(int(rec["x"]), int(rec["y"]))
+        s.state  = int(rec["state"])
+        s.resume = None if rec["resume"] < 0 else int(rec["resume"])
+        s.home, s.job = _tile(rec["home"]), _tile(rec["job"])
+        s.state_timer = int(rec["state_timer"])
+        s.vehicle = None if rec["vehicle"] < 0 else int(rec["vehicle"])
+        start, n = int(rec["path_start"]), int(rec["path_len"])
+        s.path   = tuple(paths[start:start+n]) if n else NO_PATH
+        s.path_i = int(rec["path_i"])
+        sims.append(s)
+    world.sims = sims
+    world.sim_grid.clear()
+    for s in sims:
+        if s.vehicle is None:
+            world.sim_grid.add(s, s.tile_y, s.tile_x)
+
+    prefix = "vehicle_"
+    world.vehicles = VehicleStore.restore({k[len(prefix):]: v for k, v in arrays.items()
+                                           if k.startswith(prefix)})
+    world.riders = {vid: sims[i] for vid, i in arrays["riders"].tolist()}
+
+    world.schedule = TickScheduler()
+    for tick, i in arrays["wakeups"].tolist():
+        world.schedule.schedule(sims[i], tick)
+    for start, goal, mode, waiters in meta["path_requests"]:
+        for i in waiters:
+            world.path_requests.submit(tuple(start), tuple(goal), mode, sims[i])
+    # the oldest of them were in flight at save time: start them again so
+    # they still land on the next tick
+    world.path_requests.dispatch()
+    return meta
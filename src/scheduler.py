@@ -0,0 +1,53 @@
+# src/scheduler.py
+
+class TickScheduler:
+    """
+    Wakes agents at a given future tick instead of polling them every tick.
+
+    A hashed timer wheel with one bucket per absolute tick: schedule() drops
+    the agent in the bucket for its wake tick, pop_due() takes the whole
+    bucket for the current tick. Both are O(1) per agent, so a tick costs
+    only as much as the agents actually waking up in it.
+
+    Agents carry a wake_at attribute. Rescheduling just moves wake_at and
+    leaves the old bucket entry behind; pop_due() skips entries whose
+    wake_at no longer matches.
+    """
+    def __init__(self):
+        self.buckets = {}     # tick -> [agent, ...]
+        self.pending = 0      # bucket entries, including stale ones
+
+    def __len__(self):
+        return self.pending
+
+    def schedule(self, agent, tick):
+        agent.wake_at = tick
+        self.buckets.setdefault(tick, []).append(agent)
+        self.pending += 1
+
+    def cancel(self, agent):
+        agent.wake_at = None
+
+    def entries(self):
+        """Live (tick, agent) pairs in the order they will wake."""
+        out = []
+        for tick in sorted(self.buckets):
+            seen = set()          # an agent rescheduled to the same tick has two entries
+            for agent in self.buckets[tick]:
+                if agent.wake_at == tick and id(agent) not in seen:
+                    seen.add(id(agent))
+                    out.append((tick, agent))
+        return out
+
+    def pop_due(self, tick):
+        """Agents due at tick, in the order they were scheduled."""
+        bucket = self.buckets.pop(tick, None)
+        if not bucket:
+            return []
+        self.pending -= len(bucket)
+        due = []
+        for agent in bucket:
+            if agent.wake_at == tick:
+                agent.wake_at = None
+                due.append(agent)
+        return due
@@ -2,112 +2,186 @@
 
 import pygame
 from config import TILE_SIZE
-from pathfinding import a_star
+
+DRIVE_DISTANCE = 15   # Manhattan tiles beyond which Sims take a car
+
+# state machine codes (small ints instead of per-Sim strings)
+(SEEKING_HOME, MOVING_IN, SEEKING_JOB, GOING_TO_WORK, WORKING, GOING_HOME, IDLE,
+ WAITING_FOR_PATH) = range(8)
+STATE_NAMES = ("seeking_home", "moving_in", "seeking_job", "going_to_work",
+               "working", "going_home", "idle", "waiting_for_path")
+
+NO_PATH = ()
+
+WORK_TICKS       = 480   # shift length
+IDLE_TICKS       = 240   # time at home between shifts
+SEEK_RETRY_TICKS = 30    # how often a Sim with no home/job looks again
+
+def _ticks_per_step(speed):
+    """
+    Updates a Sim used to spend per path tile: progress grew by speed each
+    tick until it reached 1.0 (float accumulation and all), then the next
+    tick moved it. Scheduled Sims sleep exactly that long between tiles.
+    """
+    progress, ticks = 0, 0
+    while progress < 1.0:
+        progress += speed
+        ticks += 1
+    return ticks + 1
 
 class Sim:
-    def __init__(self, tile_x, tile_y, game):
+    # no per-instance __dict__: a Sim is a handful of slots, so six-figure
+    # populations stay cheap
+    __slots__ = ("tile_x", "tile_y", "state", "home", "job",
+                 "path", "path_i", "state_timer", "vehicle", "wake_at", "resume")
+
+    size  = 4
+    speed = 0.05
+    step_ticks = _ticks_per_step(speed)
+
+    def __init__(self, tile_x, tile_y):
         self.tile_x = tile_x
         self.tile_y = tile_y
-        self.game = game
-        self.size = 4
 
         # state machine
-        self.state = "seeking_home"
+        self.state = SEEKING_HOME
+        self.resume = None       # state to enter once a requested path arrives
         self.home = None
         self.job = None
-        self.path = []
-        self.progress = 0
-        self.speed = 0.05
-        self.state_timer = 0
-
-        self.vehicle = None
-        self.in_vehicle = False
-
-    def update(self):
-        # 1) Movement along path
-        if self.path and self.progress >= 1.0:
-            next_tile = self.path.pop(0)
-            self.tile_y, self.tile_x = next_tile
-            self.progress = 0
-        elif self.path:
-            self.progress += self.speed
-            return  # still walking
+        self.path = NO_PATH      # walked by index, never popped from the front
+        self.path_i = 0
+        self.state_timer = 0     # tick a WORKING/IDLE spell ends
 
-        # 2) Perform state transitions
-        grid = self.game.map_mgr.grid  # use MapManager's grid
+        self.vehicle = None      # id in the world's VehicleStore while riding
+        self.wake_at = None      # tick the world's scheduler will update us
+
+    @property
+    def in_vehicle(self):
+        return self.vehicle is not None
+
+    @property
+    def state_name(self):
+        return STATE_NAMES[self.state]
+
+    def _set_path(self, path):
+        self.path = path or NO_PATH
+        self.path_i = 0
 
-        if self.state == "seeking_home":
+    def update(self, world):
+        """
+        Called by the world's scheduler when this Sim is due. Returns how
+        many ticks to sleep before the next update, or None to sleep until
+        something external (a vehicle arrival) wakes it.
+        """
+        now = world.tick
+
+        # 1) Movement along path: each wake-up is one tile reached
+        if self.path:
+            self.tile_y, self.tile_x = self.path[self.path_i]
+            self.path_i += 1
+            if self.path_i >= len(self.path):
+                self._set_path(NO_PATH)
+            else:
+                return self.step_ticks  # still walking
+
+        # 2) Perform state transitions
+        state = self.state
+        if state == SEEKING_HOME:
             # find nearest unclaimed house
-            self.home = self.game.find_nearest_tile(
-                "house", self.tile_x, self.tile_y, occupied_check=True
+            here = (self.tile_y, self.tile_x)
+            self.home = world.find_nearest_tile(
+                "house", self.tile_x, self.tile_y, occupied_check=True,
+                accept=lambda t: world.can_travel(here, t, "move_in")
             )
             if self.home:
                 # path on roads + houses
-                self.path = a_star(grid,
-                                   (self.tile_y, self.tile_x),
-                                   self.home,
-                                   valid_tiles=["road","house"])
-                self.state = "moving_in"
+                self._travel(world, self.home, MOVING_IN, mode="move_in")
 
-        elif self.state == "moving_in":
+        elif state == MOVING_IN:
             if (self.tile_y, self.tile_x) == self.home:
-                self.game.claimed_homes.add(self.home)
-                self.state = "seeking_job"
+                world.claim_home(self.home)
+                self.state = SEEKING_JOB
 
-        elif self.state == "seeking_job":
-            self.job = self.game.find_nearest_tile(
-                "factory", self.tile_x, self.tile_y, occupied_check=True
+        elif state == SEEKING_JOB:
+            self.job = world.find_nearest_tile(
+                "factory", self.tile_x, self.tile_y, occupied_check=True,
+                accept=lambda t: self._can_reach(world, t)
             )
             if self.job:
-                self.game.claimed_jobs.add(self.job)
-                self.path = self._path_to(self.job)
-                self.state = "going_to_work"
+                world.claim_job(self.job)
+                self._travel(world, self.job, GOING_TO_WORK)
 
-        elif self.state == "going_to_work":
+        elif state == GOING_TO_WORK:
             if (self.tile_y, self.tile_x) == self.job:
-                self.state = "working"
-                self.state_timer = 0
+                self.state = WORKING
+                self.state_timer = now + WORK_TICKS
 
-        elif self.state == "working":
-            self.state_timer += 1
-            if self.state_timer >= 480:
-                self.path = self._path_to(self.home)
-                self.state = "going_home"
+        elif state == WORKING:
+            if now >= self.state_timer:
+                self._travel(world, self.home, GOING_HOME)
 
-        elif self.state == "going_home":
+        elif state == GOING_HOME:
             if (self.tile_y, self.tile_x) == self.home:
-                self.state = "idle"
-                self.state_timer = 0
-
-        elif self.state == "idle":
-            self.state_timer += 1
-            if self.state_timer >= 240:
-                self.path = self._path_to(self.job)
-                self.state = "going_to_work"
-
-    def _path_to(self, target):
+                self.state = IDLE
+                self.state_timer = now + IDLE_TICKS
+
+        elif state == IDLE:
+            if now >= self.state_timer:
+                self._travel(world, self.job, GOING_TO_WORK)
+
+        return self._next_wake(now, changed=self.state != state)
+
+    def _next_wake(self, now, changed):
+        if self.path:
+            return self.step_ticks
+        if self.vehicle is not None or self.state == WAITING_FOR_PATH:
+            return None                      # world wakes us on arrival / path
+        state = self.state
+        if state in (WORKING, IDLE):
+            return max(1, self.state_timer - now)
+        if state in (SEEKING_HOME, SEEKING_JOB):
+            return 1 if changed else SEEK_RETRY_TICKS
+        target = self.home if state in (MOVING_IN, GOING_HOME) else self.job
+        if (self.tile_y, self.tile_x) == target:
+            return 1
+        return None                          # stranded with no path
+
+    def _drives_to(self, target):
+        return abs(self.tile_x - target[1]) + abs(self.tile_y - target[0]) > DRIVE_DISTANCE
+
+    def _mode_to(self, target):
+        return "drive" if self._drives_to(target) else "walk"
+
+    def _can_reach(self, world, target):
+        """Whether _travel(target) can succeed, without searching."""
+        return world.can_travel((self.tile_y, self.tile_x), target, self._mode_to(target))
+
+    def _travel(self, world, target, then, mode=None):
         """
-        Decide walk vs. drive based on Manhattan distance.
-        If driving, spawn a Vehicle; otherwise return a walk path.
+        Ask the world for a route to target (walking, or by car past
+        DRIVE_DISTANCE) and wait for it; state `then` starts once it
+        arrives. Unreachable targets skip the wait with no path.
         """
-        dist = abs(self.tile_x - target[1]) + abs(self.tile_y - target[0])
-        grid = self.game.map_mgr.grid
-
-        if dist > 15:
-            # spawn vehicle on road path
-            self.vehicle = self.game.spawn_vehicle(self.tile_x, self.tile_y, target)
-            if self.vehicle:
-                self.in_vehicle = True
-            return []
+        mode = mode or self._mode_to(target)
+        self.resume = then
+        if world.request_path(self, (self.tile_y, self.tile_x), target, mode):
+            self.state = WAITING_FOR_PATH
         else:
-            return a_star(grid,
-                          (self.tile_y, self.tile_x),
-                          target,
-                          valid_tiles=["road","house","factory"])
+            self.state = then
+
+    def on_path(self, world, path):
+        """
+        Route delivered by the world (empty if there was none, or if a
+        vehicle took it). Returns the delay to the next update, like update().
+        """
+        self.state = self.resume
+        self.resume = None
+        self._set_path(path)
+        return self._next_wake(world.tick, changed=True)
 
     def draw(self, screen, camera):
         # If in vehicle, the vehicle draws them instead
-        if self.in_vehicle:
+        if self.vehicle is not None:
             return
 
         x = self.tile_x * TILE_SIZE + TILE_SIZE // 2
@@ -0,0 +1,392 @@
+# src/simulation.py
+
+import json, random
+import savefile
+import journal
+import numpy as np
+from config      import (ROWS, COLS, TILE_SIZE, INCOME_INTERVAL_TICKS,
+                         SIM_SPAWN_INTERVAL_TICKS, MOVE_IN_TILES, WALK_TILES,
+                         DRIVE_TILES, PATH_WORKERS, GROWTH_SCAN_WORKERS,
+                         AUTOSAVE_FILE, AUTOSAVE_INTERVAL_TICKS)
+from sim         import Sim, NO_PATH
+from vehicle     import VehicleStore
+from pathfinding import PathCache, search_stats
+from profiler    import Profiler
+from pathqueue   import PathRequests, PATH_MODES
+from roadgraph   import RoadGraph
+from growthscan  import GrowthScanPool
+from components  import ComponentIndex
+from spatial     import BucketIndex, AgentGrid
+from scheduler   import TickScheduler
+from map         import MapManager
+from economy     import Economy
+from tile        import Tile
+
+# tool -> (cost, needs road next to it)
+BUILD_RULES = {
+    "road":             (10, False),
+    "house":            (25, True),
+    "factory":          (40, True),
+    "zone_residential": (0,  False),
+    "zone_industrial":  (0,  False),
+}
+
+class Simulation:
+    """
+    Headless city engine: owns the map, economy, Sims, vehicles and spawning.
+    Nothing here touches the display or wall-clock time; the world only
+    advances when step() is called, so it can be driven by the Game loop at
+    60 ticks/s or fast-forwarded in a batch job.
+    """
+    def __init__(self, rows=ROWS, cols=COLS, seed=None, tax_rate=0.10,
+                 path_workers=PATH_WORKERS, profiler=None, growth_workers=GROWTH_SCAN_WORKERS):
+        self.seed = seed
+        self.rng  = random.Random(seed)          # every random roll goes through here
+        self.profiler = profiler or Profiler(enabled=False)
+
+        # ——— Core Systems ——————————————————————————————————————————————————
+        self.map_mgr = MapManager(rows, cols, rng=self.rng)
+        self.econ    = Economy(tax_rate=tax_rate)
+        self.map_mgr.add_listener(self.econ)     # tile counts follow map edits
+        self.paths   = PathCache(self.map_mgr)   # shared a_star results
+        self.road_graph = RoadGraph(self.map_mgr)  # contracted roads for cars
+        # connectivity per travel mode, for O(1) "can I get there" checks
+        self.components = {tiles: ComponentIndex(self.map_mgr, tiles,
+                                                 goal_beside=tiles == DRIVE_TILES)
+                           for tiles in (MOVE_IN_TILES, WALK_TILES, DRIVE_TILES)}
+        # Sims' path searches, batched and solved a tick later
+        self.path_requests = PathRequests(self.map_mgr, self.paths, self.road_graph,
+                                          workers=path_workers)
+        # zone growth spread over processes; same map as in-process for a seed
+        if growth_workers > 0:
+            self.map_mgr.growth_pool = GrowthScanPool(self.map_mgr, workers=growth_workers)
+
+        # ——— State ———————————————————————————————————————————————————————
+        self.claimed_homes = set()
+        self.claimed_jobs  = set()
+        # unclaimed buildings, for nearest-free lookups without a map flood
+        self.free_homes = BucketIndex()
+        self.free_jobs  = BucketIndex()
+
+        self.tick             = 0
+        self.money            = 1000
+        self.last_income_tick = 0
+        self.income_interval  = INCOME_INTERVAL_TICKS
+        self.spawn_interval   = SIM_SPAWN_INTERVAL_TICKS
+
+        self.map_mgr.add_listener(self)          # keeps free_homes/free_jobs current
+        self.autosave = None                     # journal.Autosave once enabled
+        self.saver    = None                     # thread writing the last background save
+
+        self.sims     = []
+        self.sim_grid = AgentGrid()              # Sims on foot by tile, for drawing & clicks
+        self.schedule = TickScheduler()          # Sims only run on ticks they wake
+        self.vehicles = VehicleStore()
+        self.riders   = {}                       # vehicle id -> Sim inside it
+        self.add_sim(Sim(0,0))
+
+    # ——— Homes & jobs ——————————————————————————————————————————————————
+    def on_tiles_changed(self, changes):
+        # demolishing a building also drops its claim
+        for r, c, old, new in changes:
+            t = (r, c)
+            if old == Tile.HOUSE:
+                self.free_homes.discard(t); self.claimed_homes.discard(t)
+            elif old == Tile.FACTORY:
+                self.free_jobs.discard(t);  self.claimed_jobs.discard(t)
+            if new == Tile.HOUSE and t not in self.claimed_homes:
+                self.free_homes.add(t)
+            elif new == Tile.FACTORY and t not in self.claimed_jobs:
+                self.free_jobs.add(t)
+
+    def on_grid_reset(self, map_mgr):
+        for index, claimed, tile in ((self.free_homes, self.claimed_homes, Tile.HOUSE),
+                                     (self.free_jobs,  self.claimed_jobs,  Tile.FACTORY)):
+            index.clear()
+            for t in map_mgr.grid.positions((tile,)):
+                if t not in claimed:
+                    index.add(t)
+
+    def claim_home(self, tile):
+        self.claimed_homes.add(tile); self.free_homes.discard(tile)
+
+    def claim_job(self, tile):
+        self.claimed_jobs.add(tile);  self.free_jobs.discard(tile)
+
+    def find_nearest_tile(self, tile_type, start_x, start_y, occupied_check=False, accept=None):
+        """
+        Nearest tile of tile_type, honoring claimed homes/jobs so Sims
+        don’t re-take the same house or factory. accept(tile) can veto
+        candidates, e.g. ones in another road network. Unclaimed homes and
+        jobs come from the bucket indexes; anything else floods the map.
+        """
+        if occupied_check and tile_type == "house":
+            return self.free_homes.nearest(start_y, start_x, accept)
+        if occupied_check and tile_type == "factory":
+            return self.free_jobs.nearest(start_y, start_x, accept)
+        # MapManager.find_nearest signature: (tile_type, start_x, start_y, claimed_set, accept)
+        return self.map_mgr.find_nearest(tile_type, start_x, start_y, None, accept)
+
+    def reachable(self, start, goal, valid_tiles):
+        """O(1) connectivity check; True for tile sets that aren't indexed."""
+        index = self.components.get(tuple(valid_tiles))
+        return index is None or index.reachable(start, goal)
+
+    def can_travel(self, start, goal, mode):
+        return self.reachable(start, goal, PATH_MODES[mode])
+
+    def request_path(self, sim, start, goal, mode):
+        """
+        Queue a path search for sim, which gets it through Sim.on_path on
+        a later tick. False (and nothing queued) if goal can't be reached.
+        """
+        if not self.can_travel(start, goal, mode):
+            return False
+        self.path_requests.submit(start, goal, mode, sim)
+        return True
+
+    def deliver_paths(self):
+        """Hand last tick's finished path searches to the Sims waiting on them."""
+        for (start, goal, mode), path, sims in self.path_requests.collect():
+            for sim in sims:
+                walk = path
+                if mode == "drive":
+                    # every Sim sharing the search gets a car of its own
+                    sim.vehicle = self._launch(start[1], start[0], path, sim)
+                    if sim.vehicle is not None:
+                        self.sim_grid.remove(sim, sim.tile_y, sim.tile_x)  # drawn as the car now
+                    walk = NO_PATH
+                delay = sim.on_path(self, walk)
+                if delay is not None:
+                    self.schedule.schedule(sim, self.tick + delay)
+
+    def close(self):
+        """Stop background path and growth-scan workers and finish any saves."""
+        self.wait_for_save()
+        self.path_requests.close()
+        if self.map_mgr.growth_pool is not None:
+            self.map_mgr.growth_pool.close()
+        if self.autosave is not None:
+            self.autosave.close()
+
+    # ——— Building ——————————————————————————————————————————————————————
+    def apply_tool(self, tool, row, col):
+        """Apply a toolbar action to one tile. Returns True if the map changed."""
+        if not self.map_mgr.in_bounds(row, col):
+            return False
+        t = self.map_mgr.get(row, col)
+
+        if tool == "bulldozer":
+            if t == "grass":
+                return False
+            self.map_mgr.set_tile(row, col, "grass")
+            return True
+
+        if tool not in BUILD_RULES or t != "grass":
+            return False
+        cost, needs_road = BUILD_RULES[tool]
+        if self.money < cost:
+            return False
+        if needs_road and not self.map_mgr.has_road_neighbor(row, col):
+            return False
+        self.map_mgr.set_tile(row, col, tool)
+        self.money -= cost
+        return True
+
+    def apply_tool_cells(self, tool, cells):
+        """
+        Apply a toolbar action to many tiles (a dragged rectangle or line,
+        or any list) as one edit. Tiles the tool can't go on are skipped;
+        if the rest cost more than the treasury holds nothing is built.
+        Returns the number of tiles changed.
+        """
+        m = self.map_mgr
+        if tool != "bulldozer" and tool not in BUILD_RULES:
+            return 0
+        rc = np.array(list(dict.fromkeys(cells)), dtype=np.int64).reshape(-1, 2)
+        rc = rc[(rc >= 0).all(axis=1) & (rc[:, 0] < m.rows) & (rc[:, 1] < m.cols)]
+        if not len(rc):
+            return 0
+        # everything the rules read, from one window around the cells
+        r0, c0 = (rc.min(axis=0) - 1).tolist()
+        r1, c1 = (rc.max(axis=0) + 2).tolist()
+        win = m.grid.window(r0, r1, c0, c1)
+        rs, cs = rc[:, 0] - r0, rc[:, 1] - c0
+        here = win[rs, cs]
+
+        if tool == "bulldozer":
+            ok, cost = here != Tile.GRASS, 0
+        else:
+            cost, needs_road = BUILD_RULES[tool]
+            ok = here == Tile.GRASS
+            if needs_road:
+                road = win == Tile.ROAD
+                ok &= road[rs-1, cs] | road[rs+1, cs] | road[rs, cs-1] | road[rs, cs+1]
+        n = int(ok.sum())
+        if not n or self.money < cost * n:
+            return 0
+        new = "grass" if tool == "bulldozer" else tool
+        rows, cols = rc[ok].T.tolist()
+        m.set_tiles([(r, c, new) for r, c in zip(rows, cols)])
+        self.money -= cost * n
+        return n
+
+    # ——— Vehicle spawning —————————————————————————————————————————————
+    def _launch(self, tx, ty, path, rider=None):
+        if path:
+            # world coords in pixels
+            vid = self.vehicles.spawn(tx * TILE_SIZE, ty * TILE_SIZE, path, vehicle_type="car")
+            if rider is not None:
+                self.riders[vid] = rider
+            return vid
+        print("🚨 Invalid vehicle path:", path)
+        return None
+
+    def on_vehicles_arrived(self, ids, rows, cols):
+        """Batch callback for every vehicle that finished its path this tick."""
+        riders = self.riders
+        for vid, y, x in zip(ids.tolist(), rows.tolist(), cols.tolist()):
+            sim = riders.pop(vid, None)
+            if sim is not None:
+                # free the Sim at the last tile of the trip
+                sim.vehicle = None
+                sim.tile_y, sim.tile_x = y, x
+                self.sim_grid.add(sim, y, x)
+                self.schedule.schedule(sim, self.tick + 1)
+
+    # ——— Edge‐road Sim spawning —————————————————————————————————————
+    def spawn_sim(self):
+        rows, cols = self.map_mgr.rows, self.map_mgr.cols
+        grid = self.map_mgr.grid
+        top, bottom = grid.window(0, 1, 0, cols)[0],    grid.window(rows-1, rows, 0, cols)[0]
+        left, right = grid.window(0, rows, 0, 1)[:, 0], grid.window(0, rows, cols-1, cols)[:, 0]
+        edges=[]
+        # top/bottom
+        for c in np.flatnonzero(top==Tile.ROAD).tolist():      edges.append((c,0))
+        for c in np.flatnonzero(bottom==Tile.ROAD).tolist():   edges.append((c,rows-1))
+        # left/right
+        for r in np.flatnonzero(left==Tile.ROAD).tolist():     edges.append((0,r))
+        for r in np.flatnonzero(right==Tile.ROAD).tolist():    edges.append((cols-1,r))
+        if edges:
+            tx,ty = self.rng.choice(edges)
+            self.add_sim(Sim(tx,ty))
+
+    def add_sim(self, sim):
+        self.sims.append(sim)
+        self.sim_grid.add(sim, sim.tile_y, sim.tile_x)
+        self.schedule.schedule(sim, self.tick + 1)
+
+    def sims_at(self, row, col, radius=0):
+        """Sims on foot within radius tiles (Chebyshev) of (row, col), nearest first."""
+        found = [s for s in self.sim_grid.query(row - radius, row + radius,
+                                                col - radius, col + radius)
+                 if abs(s.tile_y - row) <= radius and abs(s.tile_x - col) <= radius]
+        found.sort(key=lambda s: abs(s.tile_y - row) + abs(s.tile_x - col))
+        return found
+
+    # ——— Save / Load —————————————————————————————————————————————————
+    def save_map(self, fn="map.json"):
+        with open(fn,"w") as f:
+            json.dump(self.map_mgr.to_names(),f)
+
+    def load_map(self, fn="map.json"):
+        try:
+            with open(fn,"r") as f:
+                grid = json.load(f)
+        except FileNotFoundError:
+            print("No saved map.")
+            return False
+        self.map_mgr.load_names(grid)
+        return True
+
+    def save_game(self, fn="city.tts", background=False):
+        """
+        Binary save of the whole world (map, Sims, vehicles, economy). With
+        background=True the file is written on a thread, which is returned.
+        """
+        self.wait_for_save()
+        self.saver = savefile.save(self, fn, background=background)
+        return self.saver
+
+    def wait_for_save(self):
+        """Block until the last background save is on disk."""
+        if self.saver is not None:
+            self.saver.join()
+            self.saver = None
+
+    def load_game(self, fn="city.tts"):
+        """Load a binary save, replaying the edit journal that continues it if any."""
+        self.wait_for_save()
+        if self.autosave is not None:
+            self.autosave.wait()          # a checkpoint in flight may be this file
+        try:
+            meta = savefile.load(self, fn)
+        except FileNotFoundError:
+            print("No saved game.")
+            return False
+        except savefile.SaveError as e:
+            print("🚨", e)
+            return False
+        if meta.get("journal_id"):
+            journal.replay(self.map_mgr, fn, meta["journal_id"])
+        return True
+
+    def enable_autosave(self, fn=AUTOSAVE_FILE):
+        """Checkpoint to fn and journal tile edits every AUTOSAVE_INTERVAL_TICKS."""
+        if self.autosave is None:
+            self.autosave = journal.Autosave(self, fn)
+
+    # ——— Ticking ———————————————————————————————————————————————————————
+    def step(self, n=1):
+        """Advance the world by n fixed ticks."""
+        for _ in range(n):
+            self._tick()
+
+    def _tick(self):
+        self.tick += 1
+        prof = self.profiler
+        searches, expanded = search_stats["searches"], search_stats["expanded"]
+        routes, routed = self.road_graph.routes, self.road_graph.total_expanded
+
+        # economy & zoning
+        with prof.section("economy"):
+            self.econ.update(self.map_mgr.grid)
+        with prof.section("zone growth"):
+            self.map_mgr.grow_zones(self.econ.residential_demand,
+                                    self.econ.industrial_demand)
+
+        # payout
+        if self.tick-self.last_income_tick>=self.income_interval:
+            self.money   += self.econ.income
+            self.econ.income=0
+            self.last_income_tick=self.tick
+
+        # Sims & Vehicles
+        with prof.section("path delivery"):
+            self.deliver_paths()
+        with prof.section("sims"):
+            grid = self.sim_grid
+            for sim in self.schedule.pop_due(self.tick):
+                here = (sim.tile_y, sim.tile_x)
+                delay = sim.update(self)
+                if (sim.tile_y, sim.tile_x) != here:
+                    grid.move(sim, here, (sim.tile_y, sim.tile_x))
+                if delay is not None:
+                    self.schedule.schedule(sim, self.tick + delay)
+        with prof.section("vehicles"):
+            self.on_vehicles_arrived(*self.vehicles.step())
+        with prof.section("pathfinding"):
+            self.path_requests.dispatch()
+        if prof.enabled:
+            # in-process searches only; worker processes keep their own counts
+            prof.count("path searches", search_stats["searches"] - searches
+                                        + self.road_graph.routes - routes)
+            prof.count("nodes expanded", search_stats["expanded"] - expanded
+                                         + self.road_graph.total_expanded - routed)
+
+        # spawn new Sim every ~5s
+        if self.tick%self.spawn_interval==0:
+            self.spawn_sim()
+
+        if self.autosave is not None and self.tick % AUTOSAVE_INTERVAL_TICKS == 0:
+            self.autosave.flush()
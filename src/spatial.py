@@ -0,0 +1,158 @@
+# src/spatial.py
+
+from config import AGENT_CELL_TILES
+
+class BucketIndex:
+    """
+    Set of tiles bucketed on a coarse grid, answering "nearest tile to
+    (row, col)" by scanning rings of buckets outward from the query and
+    stopping once no unscanned bucket can hold anything closer. Distance is
+    Manhattan, like the 4-way BFS it replaces; ties go to the lowest
+    (row, col) so results are deterministic.
+    """
+    def __init__(self, bucket=16):
+        self.bucket  = bucket
+        self.buckets = {}        # (bucket_row, bucket_col) -> set of tiles
+        self.size    = 0
+        self.extent  = None      # (min_br, max_br, min_bc, max_bc), only ever grows
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, t):
+        cell = self.buckets.get((t[0] // self.bucket, t[1] // self.bucket))
+        return cell is not None and t in cell
+
+    def add(self, t):
+        key = (t[0] // self.bucket, t[1] // self.bucket)
+        cell = self.buckets.setdefault(key, set())
+        if t not in cell:
+            cell.add(t)
+            self.size += 1
+            if self.extent is None:
+                self.extent = (key[0], key[0], key[1], key[1])
+            else:
+                a, b, c, d = self.extent
+                self.extent = (min(a, key[0]), max(b, key[0]), min(c, key[1]), max(d, key[1]))
+
+    def discard(self, t):
+        key = (t[0] // self.bucket, t[1] // self.bucket)
+        cell = self.buckets.get(key)
+        if cell is not None and t in cell:
+            cell.remove(t)
+            self.size -= 1
+            if not cell:
+                del self.buckets[key]
+
+    def clear(self):
+        self.buckets.clear()
+        self.size   = 0
+        self.extent = None
+
+    def _ring(self, br, bc, k, extent):
+        """Bucket keys at Chebyshev distance k from (br, bc), clipped to extent."""
+        min_br, max_br, min_bc, max_bc = extent
+        if k == 0:
+            yield (br, bc)
+            return
+        lo_c, hi_c = max(bc - k, min_bc), min(bc + k, max_bc)
+        for r in (br - k, br + k):
+            if min_br <= r <= max_br:
+                for c in range(lo_c, hi_c + 1):
+                    yield (r, c)
+        lo_r, hi_r = max(br - k + 1, min_br), min(br + k - 1, max_br)
+        for c in (bc - k, bc + k):
+            if min_bc <= c <= max_bc:
+                for r in range(lo_r, hi_r + 1):
+                    yield (r, c)
+
+    def nearest(self, row, col, accept=None):
+        """Closest tile to (row, col) passing accept(tile), or None."""
+        if not self.size:
+            return None
+        B = self.bucket
+        br, bc = row // B, col // B
+        extent = min_br, max_br, min_bc, max_bc = self.extent
+        max_k = max(br - min_br, max_br - br, bc - min_bc, max_bc - bc)
+        # rings closer than the extent's nearest edge hold nothing
+        min_k = max(min_br - br, br - max_br, min_bc - bc, bc - max_bc, 0)
+
+        best, best_key = None, None
+        for k in range(min_k, max_k + 1):
+            # anything in ring k is at least (k-1)*B+1 tiles away
+            if best_key is not None and best_key[0] <= (k - 1) * B:
+                break
+            for key in self._ring(br, bc, k, extent):
+                cell = self.buckets.get(key)
+                if not cell:
+                    continue
+                for t in cell:
+                    d = abs(t[0] - row) + abs(t[1] - col)
+                    cand = (d, t)
+                    if best_key is not None and cand >= best_key:
+                        continue
+                    if accept is not None and not accept(t):
+                        continue
+                    best, best_key = t, cand
+        return best
+
+
+class AgentGrid:
+    """
+    Uniform grid of cell x cell tile buckets holding moving agents (Sims),
+    so drawing and clicking only look at the agents in a few buckets
+    instead of the whole population. Owners call move() whenever an
+    agent's tile changes.
+    """
+    def __init__(self, cell=AGENT_CELL_TILES):
+        self.cell    = cell
+        self.buckets = {}        # (bucket_row, bucket_col) -> set of agents
+        self.size    = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, agent, row, col):
+        self.buckets.setdefault((row // self.cell, col // self.cell), set()).add(agent)
+        self.size += 1
+
+    def remove(self, agent, row, col):
+        key = (row // self.cell, col // self.cell)
+        bucket = self.buckets.get(key)
+        if bucket is not None and agent in bucket:
+            bucket.remove(agent)
+            self.size -= 1
+            if not bucket:
+                del self.buckets[key]
+
+    def move(self, agent, old, new):
+        """old/new are (row, col); cheap no-op while the agent stays in its bucket."""
+        C = self.cell
+        if (old[0] // C, old[1] // C) != (new[0] // C, new[1] // C):
+            self.remove(agent, *old)
+            self.add(agent, *new)
+
+    def clear(self):
+        self.buckets.clear()
+        self.size = 0
+
+    def cells(self, r0, r1, c0, c1):
+        """(bucket_row, bucket_col, agents) for buckets overlapping rows r0..r1, cols c0..c1."""
+        C = self.cell
+        br0, br1, bc0, bc1 = r0 // C, r1 // C, c0 // C, c1 // C
+        if (br1 - br0 + 1) * (bc1 - bc0 + 1) > len(self.buckets):
+            # view wider than the populated area: walk the buckets instead
+            for (br, bc), agents in self.buckets.items():
+                if br0 <= br <= br1 and bc0 <= bc <= bc1:
+                    yield br, bc, agents
+            return
+        for br in range(br0, br1 + 1):
+            for bc in range(bc0, bc1 + 1):
+                agents = self.buckets.get((br, bc))
+                if agents:
+                    yield br, bc, agents
+
+    def query(self, r0, r1, c0, c1):
+        """Agents in buckets overlapping the tile rectangle (a superset of those inside it)."""
+        for _, _, agents in self.cells(r0, r1, c0, c1):
+            yield from agents
@@ -0,0 +1,31 @@
+# src/tile.py
+
+from enum import IntEnum
+from config import COLORS
+
+class Tile(IntEnum):
+    """Tile types as stored in MapManager.grid (one uint8 per cell)."""
+    GRASS            = 0
+    ROAD             = 1
+    WATER            = 2
+    HOUSE            = 3
+    FACTORY          = 4
+    ZONE_RESIDENTIAL = 5
+    ZONE_INDUSTRIAL  = 6
+
+# id -> name ("grass", "road", ...) and back; names are what the UI/tools use
+TILE_NAMES = tuple(t.name.lower() for t in Tile)
+TILE_IDS   = {name: Tile(i) for i, name in enumerate(TILE_NAMES)}
+
+# id -> RGB, unknown names fall back to magenta like before
+TILE_COLORS = tuple(COLORS.get(name, (255,0,255)) for name in TILE_NAMES)
+
+def tile_id(tile):
+    """Accept a tile name or id and return the numeric id."""
+    if isinstance(tile, str):
+        return TILE_IDS[tile]
+    return Tile(tile)
+
+def tile_ids(tiles):
+    """Tuple of ids for an iterable of names/ids (e.g. a valid_tiles list)."""
+    return tuple(sorted({tile_id(t) for t in tiles}))
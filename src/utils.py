@@ -0,0 +1,59 @@
+# src/utils.py
+
+import math
+import numpy as np
+
+def binomial(rng, n, p):
+    """
+    Number of successes in n trials of probability p, drawn from a
+    random.Random. Skips ahead by geometric gaps between successes, so
+    the cost is O(n*p) rather than one roll per trial.
+    """
+    if n <= 0 or p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return n
+    log_q = math.log1p(-p)
+    count = 0
+    pos   = 0
+    while True:
+        # 1 - random() is in (0, 1], so the log is always defined
+        pos += int(math.log(1.0 - rng.random()) / log_q) + 1
+        if pos > n:
+            return count
+        count += 1
+
+def rect_cells(r0, c0, r1, c1):
+    """Every (row, col) of the rectangle with corners (r0, c0) and (r1, c1)."""
+    r0, r1 = min(r0, r1), max(r0, r1)
+    c0, c1 = min(c0, c1), max(c0, c1)
+    return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+def line_cells(r0, c0, r1, c1):
+    """
+    4-connected L from (r0, c0) to (r1, c1): along the longer axis first,
+    then the shorter, so a dragged road never leaves a diagonal gap.
+    """
+    dr = 1 if r1 >= r0 else -1
+    dc = 1 if c1 >= c0 else -1
+    if abs(c1 - c0) >= abs(r1 - r0):
+        return ([(r0, c) for c in range(c0, c1 + dc, dc)] +
+                [(r, c1) for r in range(r0 + dr, r1 + dr, dr)])
+    return ([(r, c0) for r in range(r0, r1 + dr, dr)] +
+            [(r1, c) for c in range(c0 + dc, c1 + dc, dc)])
+
+def neighbor_pairs(flat, cols):
+    """
+    Index pairs (i, j) into sorted flat cell indexes (row*cols+col) for
+    every two cells side by side, j being the one right of or below i.
+    """
+    n = len(flat)
+    pos = np.arange(n)
+    firsts, seconds = [], []
+    for step, ok in ((1, flat % cols < cols - 1), (cols, np.ones(n, dtype=bool))):
+        want = flat[ok] + step
+        at = np.minimum(np.searchsorted(flat, want), n - 1)
+        hit = flat[at] == want
+        firsts.append(pos[ok][hit])
+        seconds.append(at[hit])
+    return np.concatenate(firsts), np.concatenate(seconds)
@@ -1,55 +1,209 @@
 # src/vehicle.py
 
+import numpy as np
 import pygame
-from pathfinding import a_star
 from config import TILE_SIZE
 
-class Vehicle:
-    def __init__(self, x, y, path, vehicle_type="car", on_arrival=None):
-        self.x = x
-        self.y = y
-        self.path = path  # list of (row, col)
-        self.type = vehicle_type
-        self.speed = 1.0
-        self.current_tile = 0
-        self.alive = True  # will despawn after finishing
-        self.on_arrival = on_arrival  # callback to re-spawn sim etc.
-
-    def update(self):
-        if not self.path or self.current_tile >= len(self.path):
-            self.alive = False
-            return
-
-        tile = self.path[self.current_tile]
-        if not isinstance(tile, tuple) or len(tile) != 2:
-            print("🚨 Invalid tile in path:", tile)
-            self.alive = False
-            return
-
-        row, col = tile
-        target_x = col * TILE_SIZE
-        target_y = row * TILE_SIZE
-
-        dx = target_x - self.x
-        dy = target_y - self.y
-
-        dist = (dx ** 2 + dy ** 2) ** 0.5
-        if dist < self.speed:
-            self.x = target_x
-            self.y = target_y
-            self.current_tile += 1
-
-            if self.current_tile >= len(self.path):
-                self.alive = False
-                if self.on_arrival:
-                    self.on_arrival(self)  # trigger callback if defined
-        else:
-            self.x += self.speed * dx / dist
-            self.y += self.speed * dy / dist
-
-    def draw(self, screen, camera):
-        if not self.alive:
-            return
-        screen_x, screen_y = camera.apply((self.x, self.y))
-        color = (255, 0, 0) if self.type == "car" else (255, 165, 0)
-        pygame.draw.circle(screen, color, (int(screen_x), int(screen_y)), 5)
+VEHICLE_KINDS  = ("car", "truck")
+VEHICLE_COLORS = {"car": (255, 0, 0), "truck": (255, 165, 0)}
+
+class VehicleStore:
+    """
+    Every moving vehicle, stored column-wise in NumPy arrays so one step()
+    moves them all at once.
+
+    Row i of the arrays is one live vehicle; rows are kept packed, and
+    finished vehicles are squeezed out in a single pass per step. Paths live
+    back to back in one shared (row, col) buffer; each vehicle only keeps
+    where its path starts, how long it is and which step it is heading to.
+    Vehicles are referred to by a stable integer id, not by row.
+    """
+    COLUMNS = ("ids", "x", "y", "speed", "cursor", "path_start", "path_len", "kind")
+
+    def __init__(self, capacity=64):
+        self.count   = 0
+        self.next_id = 0
+        self._alloc(capacity)
+        self.path_rows = np.zeros(capacity * 16, dtype=np.int32)
+        self.path_cols = np.zeros(capacity * 16, dtype=np.int32)
+        self.path_used = 0        # buffer slots handed out, live or not
+        self.path_live = 0        # buffer slots owned by live vehicles
+
+    def _alloc(self, capacity):
+        old = getattr(self, "ids", None)
+        n   = self.count
+        new = {
+            "ids":        np.zeros(capacity, dtype=np.int64),
+            "x":          np.zeros(capacity, dtype=np.float64),
+            "y":          np.zeros(capacity, dtype=np.float64),
+            "speed":      np.zeros(capacity, dtype=np.float64),
+            "cursor":     np.zeros(capacity, dtype=np.int64),   # index of the tile heading to
+            "path_start": np.zeros(capacity, dtype=np.int64),
+            "path_len":   np.zeros(capacity, dtype=np.int64),
+            "kind":       np.zeros(capacity, dtype=np.uint8),
+        }
+        if old is not None:
+            for name, arr in new.items():
+                arr[:n] = getattr(self, name)[:n]
+        for name, arr in new.items():
+            setattr(self, name, arr)
+
+    def __len__(self):
+        return self.count
+
+    # ——— Spawning ———————————————————————————————————————————————————————
+    def spawn(self, x, y, path, vehicle_type="car", speed=1.0):
+        """Add a vehicle at pixel (x, y) following path [(row, col), ...]; returns its id."""
+        if not path:
+            return None
+        if self.count == len(self.ids):
+            self._alloc(2 * len(self.ids))
+        start = self._store_path(path)
+
+        i = self.count
+        vid = self.next_id
+        self.next_id += 1
+        self.ids[i], self.x[i], self.y[i], self.speed[i] = vid, x, y, speed
+        self.cursor[i], self.path_start[i], self.path_len[i] = 0, start, len(path)
+        self.kind[i] = VEHICLE_KINDS.index(vehicle_type)
+        self.count += 1
+        return vid
+
+    def _store_path(self, path):
+        n = len(path)
+        if self.path_used + n > len(self.path_rows):
+            self._compact_paths(extra=n)
+        start = self.path_used
+        tiles = np.asarray(path, dtype=np.int32).reshape(n, 2)
+        self.path_rows[start:start+n] = tiles[:, 0]
+        self.path_cols[start:start+n] = tiles[:, 1]
+        self.path_used += n
+        self.path_live += n
+        return start
+
+    def _compact_paths(self, extra=0):
+        """Drop finished vehicles' paths from the buffer, growing it if needed."""
+        n     = self.count
+        lens  = self.path_len[:n]
+        total = int(lens.sum())
+        size  = len(self.path_rows)
+        while total + extra > size // 2:
+            size *= 2
+        # gather every live path's slots in row order
+        offsets = np.repeat(self.path_start[:n] - np.cumsum(lens) + lens, lens)
+        src = offsets + np.arange(total)
+        rows = np.zeros(size, dtype=np.int32); rows[:total] = self.path_rows[src]
+        cols = np.zeros(size, dtype=np.int32); cols[:total] = self.path_cols[src]
+        self.path_start[:n] = np.cumsum(lens) - lens
+        self.path_rows, self.path_cols = rows, cols
+        self.path_used = self.path_live = total
+
+    # ——— Stepping ————————————————————————————————————————————————————————
+    def step(self):
+        """
+        Move every vehicle one tick toward its current path tile. Returns
+        (ids, final_rows, final_cols) for the vehicles that reached the end
+        of their path this tick; they are removed from the store.
+        """
+        n = self.count
+        empty = np.zeros(0, dtype=np.int64)
+        if n == 0:
+            return empty, empty, empty
+
+        x, y, speed, cursor = self.x[:n], self.y[:n], self.speed[:n], self.cursor[:n]
+        at = self.path_start[:n] + cursor
+        tx = self.path_cols[at] * float(TILE_SIZE)
+        ty = self.path_rows[at] * float(TILE_SIZE)
+        dx, dy = tx - x, ty - y
+        dist = np.sqrt(dx * dx + dy * dy)
+
+        # close enough: snap onto the tile and aim for the next one
+        snap = dist < speed
+        x[snap] = tx[snap]
+        y[snap] = ty[snap]
+        cursor[snap] += 1
+
+        move = ~snap
+        f = speed[move] / dist[move]
+        x[move] += f * dx[move]
+        y[move] += f * dy[move]
+
+        done = cursor >= self.path_len[:n]
+        if not done.any():
+            return empty, empty, empty
+
+        last = self.path_start[:n][done] + self.path_len[:n][done] - 1
+        arrived = (self.ids[:n][done].copy(),
+                   self.path_rows[last].astype(np.int64),
+                   self.path_cols[last].astype(np.int64))
+
+        keep = ~done
+        m = int(keep.sum())
+        for name in self.COLUMNS:
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        self.count = m
+        self.path_live = int(self.path_len[:m].sum())
+        if self.path_used > 4 * max(self.path_live, 1024):
+            self._compact_paths()
+        return arrived
+
+    # ——— Save / Load ———————————————————————————————————————————————————————
+    def export(self):
+        """Live vehicles as {name: array}, paths packed back to back."""
+        self._compact_paths()
+        n = self.count
+        state = {name: getattr(self, name)[:n].copy() for name in self.COLUMNS}
+        state["path_rows"] = self.path_rows[:self.path_used].copy()
+        state["path_cols"] = self.path_cols[:self.path_used].copy()
+        state["next_id"]   = np.array([self.next_id], dtype=np.int64)
+        return state
+
+    @classmethod
+    def restore(cls, state):
+        n = len(state["ids"])
+        store = cls(capacity=max(64, n))
+        for name in cls.COLUMNS:
+            getattr(store, name)[:n] = state[name]
+        store.count   = n
+        store.next_id = int(state["next_id"][0])
+        used = len(state["path_rows"])
+        if used > len(store.path_rows):
+            store.path_rows = np.zeros(2 * used, dtype=np.int32)
+            store.path_cols = np.zeros(2 * used, dtype=np.int32)
+        store.path_rows[:used] = state["path_rows"]
+        store.path_cols[:used] = state["path_cols"]
+        store.path_used = store.path_live = used
+        return store
+
+    # ——— Rendering ———————————————————————————————————————————————————————
+    def _in_view(self, view):
+        """Rows inside view = (x0, y0, x1, y1) world pixels, or all rows if None."""
+        n = self.count
+        if view is None:
+            return np.arange(n)
+        x0, y0, x1, y1 = view
+        x, y = self.x[:n], self.y[:n]
+        return np.flatnonzero((x >= x0) & (x < x1) & (y >= y0) & (y < y1))
+
+    def draw(self, screen, camera, view=None):
+        """Draw the vehicles inside view (see _in_view); returns how many."""
+        rows = self._in_view(view) if self.count else ()
+        if not len(rows):
+            return 0
+        sx = ((self.x[rows] - camera.x) * camera.zoom).astype(int).tolist()
+        sy = ((self.y[rows] - camera.y) * camera.zoom).astype(int).tolist()
+        colors = [VEHICLE_COLORS[k] for k in VEHICLE_KINDS]
+        for px, py, k in zip(sx, sy, self.kind[rows].tolist()):
+            pygame.draw.circle(screen, colors[k], (px, py), 5)
+        return len(rows)
+
+    def density(self, cell_px, view=None):
+        """{(bucket_row, bucket_col): vehicles} over cell_px-pixel buckets inside view."""
+        rows = self._in_view(view) if self.count else ()
+        if not len(rows):
+            return {}
+        br = (self.y[rows] // cell_px).astype(np.int64)
+        bc = (self.x[rows] // cell_px).astype(np.int64)
+        keys, counts = np.unique(np.stack((br, bc), axis=1), axis=0, return_counts=True)
+        return {(r, c): n for (r, c), n in zip(keys.tolist(), counts.tolist())}
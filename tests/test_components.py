@@ -0,0 +1,72 @@
+# tests/test_components.py
+
+import os, random, sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from components import ComponentIndex
+from map        import MapManager, NEIGHBORS
+
+VALID = ("road", "house")
+N = 24
+
+def _flooded(m, tiles=VALID):
+    """The components of tiles by plain BFS, as a set of frozensets."""
+    todo = set(m.positions(tiles))
+    parts = set()
+    while todo:
+        seed = todo.pop()
+        part, queue = {seed}, deque([seed])
+        while queue:
+            r, c = queue.popleft()
+            for dr, dc in NEIGHBORS:
+                n = (r + dr, c + dc)
+                if n in todo:
+                    todo.discard(n)
+                    part.add(n)
+                    queue.append(n)
+        parts.add(frozenset(part))
+    return parts
+
+def _parts(index):
+    index.refresh()
+    assert all(index.label[t] == cid for cid, tiles in index.members.items() for t in tiles)
+    return {frozenset(tiles) for tiles in index.members.values() if tiles}
+
+def test_incremental_components_match_a_fresh_flood():
+    for seed in range(8):
+        rng = random.Random(seed)
+        m = MapManager(N, N, rng=rng)
+        index = ComponentIndex(m, VALID)
+        for step in range(300):
+            if step % 30 == 29:
+                # a batch: big ones go stale, small ones merge/split per tile
+                m.set_tiles([(rng.randrange(N), rng.randrange(N),
+                              rng.choice(["road", "house", "grass"]))
+                             for _ in range(rng.choice([3, 40, 400]))])
+            else:
+                m.set_tile(rng.randrange(N), rng.randrange(N),
+                           rng.choice(["road", "road", "house", "grass", "factory"]))
+            if step % 10 == 0:
+                assert _parts(index) == _flooded(m), (seed, step)
+
+def test_reachable_follows_the_components():
+    rng = random.Random(3)
+    m = MapManager(N, N, rng=rng)
+    m.set_tiles([(rng.randrange(N), rng.randrange(N), "road") for _ in range(250)])
+    strict, beside = ComponentIndex(m, ("road",)), ComponentIndex(m, ("road",), goal_beside=True)
+    parts = {t: part for part in _flooded(m, ("road",)) for t in part}
+    for _ in range(300):
+        s = (rng.randrange(N), rng.randrange(N))
+        g = (rng.randrange(N), rng.randrange(N))
+        starts = _around(parts, s)
+        assert strict.reachable(s, g) == (g in parts and parts[g] in starts)
+        assert beside.reachable(s, g) == bool(starts & _around(parts, g))
+
+def _around(parts, t):
+    """Components a trip at t can use: its own, or its neighbours'."""
+    if t in parts:
+        return {parts[t]}
+    r, c = t
+    return {parts[(r + dr, c + dc)] for dr, dc in NEIGHBORS if (r + dr, c + dc) in parts}
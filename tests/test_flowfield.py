@@ -0,0 +1,40 @@
+# tests/test_flowfield.py
+
+import os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench       import synthetic_city
+from config      import WALK_TILES
+from flowfield   import FlowFields
+from pathfinding import a_star
+
+def _valid_walk(m, start, goal, path):
+    mask = m.passable(WALK_TILES)
+    prev = start
+    for r, c in path:
+        if abs(r - prev[0]) + abs(c - prev[1]) != 1 or not mask[r * m.cols + c]:
+            return False
+        prev = (r, c)
+    return path[-1] == goal
+
+def test_field_walks_are_as_short_as_searches():
+    for layout in ("grid", "organic"):
+        world = synthetic_city(80, layout, sims=0, seed=2)
+        m = world.map_mgr
+        fields = FlowFields(m, min_shared=1)
+        rng = random.Random(1)
+        walk = m.positions(WALK_TILES)
+        hubs = walk[:4]
+        for i in range(150):
+            other = rng.choice(walk) if i % 3 else (rng.randrange(80), rng.randrange(80))
+            start, goal = (hubs[i % 4], other) if i % 2 else (other, hubs[i % 4])
+            got = fields.route(start, goal, WALK_TILES)
+            want = a_star(m.grid.to_dense(), start, goal, WALK_TILES)
+            assert got is not None and len(got) == len(want), (layout, start, goal)
+            assert not got or _valid_walk(m, start, goal, got)
+            if i == 75:
+                # a road edit drops the fields it could change
+                r, c = rng.choice(m.positions(("road",)))
+                m.set_tile(r, c, "grass")
+        world.close()
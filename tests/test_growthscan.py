@@ -0,0 +1,35 @@
+# tests/test_growthscan.py
+
+import os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import map as map_module
+from bench      import random_road_grid, zone_lots
+from simulation import Simulation
+
+def test_pooled_scan_grows_the_same_city(monkeypatch):
+    monkeypatch.setattr(map_module, "GROWTH_INDEX_LIMIT", 40)   # scan even a small city
+    rng = random.Random(1)
+    grid = random_road_grid(160, rng, noise=0.0)
+    zone_lots(grid, rng, 0.3, 0.5)
+    grid[:, 100:] = 0
+    runs = []
+    for workers in (0, 2):
+        world = Simulation(160, 160, seed=1, path_workers=0, growth_workers=workers)
+        world.map_mgr.load_grid(grid.copy())
+        assert world.map_mgr.growable is None
+        world.step(20)
+        # edits between scans, including a chunk built on and bulldozed away again
+        m = world.map_mgr
+        m.set_tiles([(140, c, "road") for c in range(130, 140)] +
+                     [(141, c, "zone_residential") for c in range(130, 140)])
+        world.step(20)
+        m.set_tiles([(r, c, "grass") for r in (140, 141) for c in range(130, 140)])
+        world.step(20)
+        assert workers == 0 or m.growth_pool.slots     # the scan ran on the pool
+        runs.append((m.grid.to_dense(), world.money))
+        world.close()
+    (a, money_a), (b, money_b) = runs
+    assert (a == b).all() and money_a == money_b
+    assert (a != grid).any()
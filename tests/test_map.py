@@ -0,0 +1,76 @@
+# tests/test_map.py
+
+import os, random, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import map as map_module
+from map   import MapManager, ZONE_BUILDINGS, frontier_masks
+from tile  import Tile
+from utils import line_cells, rect_cells
+
+def test_drag_past_the_map_edge_stays_on_the_map():
+    m = MapManager(40, 40, rng=random.Random(1))
+    before = m.grid.to_dense()
+    edits = [(r, c, Tile.ROAD) for r, c in line_cells(20, 20, -15, 70)]
+    edits += [(r, c, Tile.ZONE_RESIDENTIAL) for r, c in rect_cells(30, 30, 45, 45)]
+    changes = m.set_tiles(edits)
+    assert changes and all(0 <= r < 40 and 0 <= c < 40 for r, c, _, _ in changes)
+    C = m.grid.chunk
+    assert all(0 <= cr * C < 40 and 0 <= cc * C < 40 for cr, cc in m.grid.chunks)
+
+    expected = before.copy()
+    for r, c, tile in edits:
+        if 0 <= r < 40 and 0 <= c < 40:
+            expected[r, c] = tile
+    assert (m.grid.to_dense() == expected).all()
+    assert m.set_tiles([(-1, 5, "road"), (5, 40, "road")]) == []
+
+def _frontier(m):
+    """Zone tiles with a road beside them, by the per-tile definition."""
+    return {zone: {t for t in m.positions((zone,)) if m.has_road_neighbor(*t)}
+            for zone in ZONE_BUILDINGS}
+
+def _random_city(size, seed):
+    gen = np.random.default_rng(seed)
+    return gen.choice([Tile.GRASS, Tile.ROAD, Tile.ZONE_RESIDENTIAL, Tile.ZONE_INDUSTRIAL],
+                      size=(size, size), p=[.5, .2, .15, .15]).astype(np.uint8)
+
+def test_frontier_masks_match_the_per_tile_rule():
+    m = MapManager(150, 150, rng=random.Random(2))
+    m.load_grid(_random_city(150, 2))
+    masks = frontier_masks(np.pad(m.grid.to_dense(), 1))
+    got = {zone: {tuple(t) for t in np.argwhere(mask).tolist()} for zone, mask in masks}
+    assert got == _frontier(m)
+
+def test_growable_index_follows_edits():
+    rng = random.Random(4)
+    m = MapManager(70, 70, rng=rng)
+    m.load_grid(_random_city(70, 4))
+    tiles = [Tile.GRASS, Tile.ROAD, Tile.ZONE_RESIDENTIAL, Tile.ZONE_INDUSTRIAL, Tile.HOUSE]
+    for step in range(600):
+        if step % 100 == 99:
+            m.set_tiles([(rng.randrange(70), rng.randrange(70), rng.choice(tiles))
+                         for _ in range(rng.choice([20, 3000]))])
+        else:
+            m.set_tile(rng.randrange(70), rng.randrange(70), rng.choice(tiles))
+        if step % 50 == 0:
+            assert m.growable == _frontier(m), step
+
+def test_chunk_scan_grows_at_the_indexed_rate(monkeypatch):
+    grid = _random_city(200, 6)
+    grown = {}
+    for scan in (False, True):
+        monkeypatch.setattr(map_module, "GROWTH_INDEX_LIMIT", 10 if scan else 10 ** 9)
+        m = MapManager(200, 200, rng=random.Random(6))
+        m.load_grid(grid)
+        assert (m.growable is None) == scan
+        frontier = sum(len(cells) for cells in _frontier(m).values())
+        for _ in range(20):
+            m.grow_zones(True, True)
+        grown[scan] = int(np.count_nonzero(m.grid.to_dense() != grid))
+    # converted tiles leave the frontier, so a little under this many
+    most = frontier * map_module.GROWTH_CHANCE * 20
+    assert all(0.8 * most < n < most for n in grown.values()), (grown, most)
+    assert abs(grown[True] - grown[False]) < 0.1 * most
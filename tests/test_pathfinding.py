@@ -0,0 +1,47 @@
+# tests/test_pathfinding.py
+
+import os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from map         import MapManager
+from pathfinding import PathCache, a_star
+
+N = 30
+ROADS = ["road"]
+
+def _road_grid(m):
+    m.set_tiles([(r, c, "road") for r in range(N) for c in range(N) if r % 5 == 0 or c % 5 == 0])
+
+def test_only_edits_to_the_searched_tiles_invalidate():
+    m = MapManager(N, N, rng=random.Random(1))
+    _road_grid(m)
+    cache = PathCache(m)
+    start, goal = (0, 0), (25, 25)
+    path = cache.get(start, goal, ROADS)
+    assert len(path) == 50
+    assert cache.get(start, goal, ROADS) == path and cache.hits == 1
+
+    m.set_tile(2, 2, "zone_residential")        # nobody walks on zones
+    assert cache.get(start, goal, ROADS) == path
+    assert (cache.hits, cache.stale) == (2, 0)
+
+    blocked = path[len(path) // 2]
+    m.set_tile(*blocked, "grass")
+    detour = cache.get(start, goal, ROADS)
+    assert cache.stale == 1 and blocked not in detour
+    assert len(detour) == len(a_star(m.grid.to_dense(), start, goal, ROADS))
+
+def test_cached_paths_match_fresh_searches_through_random_edits():
+    rng = random.Random(5)
+    m = MapManager(N, N, rng=rng)
+    _road_grid(m)
+    cache = PathCache(m)
+    ends = [(r, c) for r in range(0, N, 5) for c in range(0, N, 5)]
+    for step in range(400):
+        if step % 4 == 0:
+            m.set_tile(rng.randrange(N), rng.randrange(N), rng.choice(["road", "grass", "house"]))
+        start, goal = rng.choice(ends), rng.choice(ends)
+        got = cache.get(start, goal, ROADS)
+        assert len(got) == len(a_star(m.grid.to_dense(), start, goal, ROADS)), step
+    assert cache.hits and cache.stale
@@ -0,0 +1,24 @@
+# tests/test_pathqueue.py
+
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bench import synthetic_city
+
+def _trace(path_workers, ticks):
+    world = synthetic_city(120, "organic", sims=300, seed=5, path_workers=path_workers)
+    trace = []
+    for _ in range(ticks):
+        world.step(1)
+        trace.append([(s.tile_x, s.tile_y, s.state, s.vehicle) for s in world.sims])
+    solved = world.path_requests.stats()["solved"]
+    world.close()
+    return trace, solved
+
+def test_worker_count_does_not_change_the_run():
+    serial, solved = _trace(0, 300)
+    pooled, pooled_solved = _trace(2, 300)
+    assert solved and pooled_solved == solved
+    for tick, (a, b) in enumerate(zip(serial, pooled)):
+        assert a == b, f"runs diverge at tick {tick}"
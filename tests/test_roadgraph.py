@@ -0,0 +1,75 @@
+# tests/test_roadgraph.py
+
+import os, random, sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from map       import MapManager, NEIGHBORS
+from roadgraph import RoadGraph
+from tile      import Tile
+
+N = 20
+
+def _bfs_length(m, start, goal):
+    """Steps of the shortest road trip from start to goal (either may be off-road), or None."""
+    def road(t):
+        return m.in_bounds(*t) and m.grid[t] == Tile.ROAD
+    if start == goal:
+        return 0
+    dist, queue = {start: 0}, deque([start])
+    while queue:
+        t = queue.popleft()
+        for dr, dc in NEIGHBORS:
+            n = (t[0] + dr, t[1] + dc)
+            if n in dist:
+                continue
+            if n == goal and (road(t) or road(goal)):
+                return dist[t] + 1
+            if road(n):
+                dist[n] = dist[t] + 1
+                queue.append(n)
+    return None
+
+def _natural(graph):
+    """Nodes that are dead ends, junctions or isolated, i.e. not picked to break a loop."""
+    return {t for t in graph.nodes if len(graph._road_neighbors(t)) != 2}
+
+def _check_route(m, graph, start, goal):
+    path = graph.route(start, goal)
+    want = _bfs_length(m, start, goal)
+    if not path:
+        assert want in (None, 0), (start, goal, want)
+        return
+    assert len(path) == want, (start, goal, path)
+    prev = start
+    for t in path:
+        assert abs(t[0] - prev[0]) + abs(t[1] - prev[1]) == 1
+        prev = t
+    assert path[-1] == goal
+    assert all(m.grid[t] == Tile.ROAD for t in path[:-1])
+
+def test_incremental_graph_routes_like_a_search_and_matches_a_rebuild():
+    for seed in range(12):
+        rng = random.Random(seed)
+        m = MapManager(N, N, rng=rng)
+        graph = RoadGraph(m)
+        for step in range(300):
+            if step % 50 == 49:
+                m.set_tiles([(rng.randrange(N), rng.randrange(N), rng.choice(["road", "grass"]))
+                             for _ in range(rng.choice([4, 150]))])
+            else:
+                m.set_tile(rng.randrange(N), rng.randrange(N),
+                           rng.choice(["road", "road", "grass", "house"]))
+            _check_route(m, graph, (rng.randrange(N), rng.randrange(N)),
+                         (rng.randrange(N), rng.randrange(N)))
+            if step % 20 == 0:
+                fresh = RoadGraph(m)
+                fresh.refresh()
+                assert graph.roads == fresh.roads
+                # every road tile is a node or inside exactly one edge
+                assert set(graph.tile_edge) | graph.nodes == graph.roads
+                assert not set(graph.tile_edge) & graph.nodes
+                assert _natural(graph) == _natural(fresh)
+                assert all(a in graph.nodes and b in graph.nodes
+                           for a, b, _ in graph.edges.values())
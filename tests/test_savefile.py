@@ -0,0 +1,74 @@
+# tests/test_savefile.py
+
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import savefile
+from bench      import synthetic_city
+from simulation import Simulation
+
+def _state(world):
+    sims = [(s.tile_x, s.tile_y, s.state, s.home, s.job, s.vehicle) for s in world.sims]
+    return (world.tick, world.money, sims, world.vehicles.count)
+
+def test_loaded_city_carries_on_like_the_unsaved_one(tmp_path):
+    fn = str(tmp_path / "city.tts")
+    for size in (60, 150):
+        world = synthetic_city(size, "grid", sims=100, seed=3)
+        world.step(300)
+        savefile.save(world, fn)
+        loaded = Simulation(size, size, seed=99, path_workers=0)
+        savefile.load(loaded, fn)
+        assert (loaded.map_mgr.grid.to_dense() == world.map_mgr.grid.to_dense()).all()
+
+        world.step(3000)
+        loaded.step(3000)
+        assert (loaded.map_mgr.grid.to_dense() == world.map_mgr.grid.to_dense()).all()
+        assert _state(loaded) == _state(world)
+        world.close()
+        loaded.close()
+
+def test_saving_over_the_loaded_file(tmp_path):
+    fn = str(tmp_path / "city.tts")
+    world = synthetic_city(60, "grid", sims=20, seed=1)
+    world.save_game(fn)
+    assert world.load_game(fn)
+    assert any(isinstance(b, np.memmap) for b in world.map_mgr.grid.chunks.values())
+    world.step(100)
+    world.save_game(fn)
+    # the map no longer reads from the file it just replaced
+    assert not any(isinstance(b, np.memmap) for b in world.map_mgr.grid.chunks.values())
+    grid = world.map_mgr.grid.to_dense()
+    assert world.load_game(fn)
+    assert (world.map_mgr.grid.to_dense() == grid).all()
+    world.close()
+
+def test_load_waits_for_a_background_save(tmp_path):
+    fn = str(tmp_path / "city.tts")
+    world = synthetic_city(60, "grid", sims=20, seed=2)
+    world.step(50)
+    world.save_game(fn, background=True)
+    tick = world.tick
+    world.step(50)
+    assert world.load_game(fn)
+    assert world.tick == tick
+    world.close()
+
+def test_truncated_save_is_refused(tmp_path):
+    fn = str(tmp_path / "city.tts")
+    world = synthetic_city(60, "grid", sims=20, seed=4)
+    world.step(50)
+    world.save_game(fn)
+    with open(fn, "rb") as f:
+        data = f.read()
+    grid, tick = world.map_mgr.grid.to_dense(), world.tick
+    for keep in (savefile._HEADER.size + 4, len(data) // 2, len(data) - 8):
+        cut = str(tmp_path / f"cut{keep}.tts")
+        with open(cut, "wb") as f:
+            f.write(data[:keep])
+        assert not world.load_game(cut)
+        assert world.tick == tick
+        assert (world.map_mgr.grid.to_dense() == grid).all()
+    world.close()
@@ -0,0 +1,39 @@
+# tests/test_scheduler.py
+
+import os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from scheduler import TickScheduler
+
+class _Agent:
+    wake_at = None
+
+def test_agents_wake_once_at_their_latest_tick_in_schedule_order():
+    rng = random.Random(11)
+    sched = TickScheduler()
+    agents = [_Agent() for _ in range(50)]
+    due_at = {}                 # agent -> tick it should wake at
+    order = []                  # (tick, agent) schedule calls, oldest first
+    for tick in range(400):
+        for _ in range(rng.randrange(6)):
+            agent = rng.choice(agents)
+            if rng.random() < 0.15:
+                sched.cancel(agent)
+                due_at.pop(agent, None)
+            else:
+                when = tick + rng.randrange(1, 20)
+                sched.schedule(agent, when)
+                due_at[agent] = when
+                order.append((when, agent))
+        assert sorted(sched.entries(), key=lambda e: (e[0], id(e[1]))) == \
+            sorted(((w, a) for a, w in due_at.items()), key=lambda e: (e[0], id(e[1])))
+
+        want = []
+        for when, agent in order:
+            if when == tick and due_at.get(agent) == tick and agent not in want:
+                want.append(agent)
+        assert sched.pop_due(tick) == want, tick
+        for agent in want:
+            del due_at[agent]
+            assert agent.wake_at is None
@@ -0,0 +1,27 @@
+# tests/test_spatial.py
+
+import os, random, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from spatial import BucketIndex
+
+def test_nearest_matches_a_full_scan():
+    rng = random.Random(7)
+    for bucket in (1, 4, 16):
+        index, live = BucketIndex(bucket=bucket), set()
+        for step in range(2000):
+            t = (rng.randrange(-20, 120), rng.randrange(0, 90))
+            if rng.random() < 0.6:
+                index.add(t); live.add(t)
+            else:
+                index.discard(t); live.discard(t)
+            if step % 5:
+                continue
+            assert len(index) == len(live)
+            row, col = rng.randrange(-60, 160), rng.randrange(-40, 130)
+            accept = None if step % 2 else (lambda t: (t[0] + t[1]) % 3 == 0)
+            ok = [t for t in live if accept is None or accept(t)]
+            # Manhattan distance, ties to the lowest (row, col)
+            want = min(ok, key=lambda t: (abs(t[0] - row) + abs(t[1] - col), t)) if ok else None
+            assert index.nearest(row, col, accept) == want, (bucket, step)